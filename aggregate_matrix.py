@@ -0,0 +1,567 @@
+"""
+Times-table pair aggregates shared by every worker process.
+
+The agg_pair totals (effective time, answer count and wrong count for every
+a x b pair) are kept in a fixed-layout multiprocessing.shared_memory
+segment, so any gunicorn worker can build the heatmap without touching
+SQLite. SQLite stays the source of truth: the segment is checked against
+agg_pair when a worker attaches to it and periodically afterwards, and
+rebuilt from it whenever the two disagree.
+
+Writers hold an exclusive flock on a lock file next to the database while
+they commit responses to SQLite and add them to the segment, so the two
+always move together. A writer that dies halfway leaves the segment marked
+dirty, and the next writer rebuilds it. Readers take no lock; a sequence
+counter in the header tells them to retry if they overlapped a write.
+
+Pairs outside 0..MAX_FACTOR, which the game never asks but /submit
+accepts, do not fit the segment. A flag in the header records whether
+agg_pair has any, and while it does they are read from SQLite and added to
+the heatmap and world stats, so those match agg_pair as a whole.
+
+Every add() bumps the version and records which cells it touched in a ring
+of the last HISTORY versions, so a client holding the heatmap of a recent
+version can be sent only the cells that changed since. A rebuild starts a
+new epoch, which invalidates every version clients hold.
+
+The segment outlives the worker processes. Run
+`python aggregate_matrix.py --unlink` after stopping the server to remove
+it, e.g. from ExecStopPost.
+
+Segment layout (native byte order):
+    header   magic, sequence, version, epoch, dirty, outliers (HEADER)
+    sums     (MAX_FACTOR + 1)^2 doubles of total effective time, row a, column b
+    counts   (MAX_FACTOR + 1)^2 doubles of answer counts
+    wrongs   (MAX_FACTOR + 1)^2 doubles of wrong answer counts
+    changes  HISTORY entries of a version and a bitmap of the cells it changed
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Optional: without it only threads of one process are serialized
+    fcntl = None
+
+# Largest factor the segment holds; agg_pair rows outside 0..MAX_FACTOR are
+# read from SQLite instead
+MAX_FACTOR = 20
+CELLS = (MAX_FACTOR + 1) ** 2
+# SQL condition matching the agg_pair rows the segment holds
+IN_RANGE = (
+    "typeof(a) = 'integer' AND a BETWEEN 0 AND {0} "
+    "AND typeof(b) = 'integer' AND b BETWEEN 0 AND {0}"
+).format(MAX_FACTOR)
+
+MAGIC = b"AGGPAIR3"
+# magic, sequence (odd while a write is in progress), version, epoch, dirty,
+# and whether agg_pair has pairs outside the segment
+HEADER = struct.Struct("=8sQQQQQ")
+ARRAY_SIZE = CELLS * 8
+
+# Versions whose changed cells are remembered
+HISTORY = 256
+CHANGE_VERSION = struct.Struct("=Q")
+BITMAP_SIZE = (CELLS + 63) // 64 * 8
+CHANGE_SIZE = CHANGE_VERSION.size + BITMAP_SIZE
+CHANGES_OFFSET = HEADER.size + 3 * ARRAY_SIZE
+SEGMENT_SIZE = CHANGES_OFFSET + HISTORY * CHANGE_SIZE
+
+# Attempts a reader makes to get a copy no writer overlapped
+MAX_READ_ATTEMPTS = 100
+
+
+class Snapshot(NamedTuple):
+    """Consistent copy of the aggregates."""
+
+    epoch: int
+    version: int
+    sums: List[float]
+    counts: List[float]
+    wrongs: List[float]
+    changes: bytes
+    outliers: bool
+
+
+class Heatmap(NamedTuple):
+    """Heatmap cells and world stats at one version of the aggregates."""
+
+    epoch: int
+    version: int
+    # Every cell, or only the changed ones if delta is set
+    cells: Dict[str, Dict[str, Any]]
+    delta: bool
+    world_avg: float
+    world_count: int
+
+
+def cell_index(a: Any, b: Any) -> Optional[int]:
+    """
+    Get the position of pair a x b in the arrays, or None if it is out of range.
+
+    a and b are the values SQLite stored, so anything but an integer, such
+    as a real 2.5, is out of range too, as it is in IN_RANGE.
+    """
+    if (
+        type(a) is int
+        and type(b) is int
+        and 0 <= a <= MAX_FACTOR
+        and 0 <= b <= MAX_FACTOR
+    ):
+        return a * (MAX_FACTOR + 1) + b
+    return None
+
+
+def segment_name(database: str) -> str:
+    """Name the segment after the database file, so each database gets its own."""
+    digest = hashlib.sha1(os.path.abspath(database).encode()).hexdigest()[:12]
+    return f"ttc_agg_{digest}"
+
+
+def open_segment(name: str, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    Open a shared memory segment, creating it if a size is given, untracked.
+
+    The segment must outlive the process that opened it, so it is kept off
+    the resource tracker, which would otherwise unlink it when that process
+    exits. Python 3.13 can be told so directly; before that the segment is
+    unregistered under the name the tracker records, which on POSIX has a
+    leading slash.
+    """
+    try:
+        return shared_memory.SharedMemory(name, create=size > 0, size=size, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name, create=size > 0, size=size)
+        if os.name == "posix":
+            resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+        return shm
+
+
+class AggregateMatrix:
+    """
+    Shared-memory copy of the agg_pair table.
+
+    Args:
+        database (str): Path of the SQLite database the aggregates come from
+        check_interval (float): Seconds between checks against agg_pair
+    """
+
+    def __init__(self, database: str, check_interval: float = 60.0) -> None:
+        self.database = database
+        self.name = os.environ.get("AGGREGATE_SHM_NAME", segment_name(database))
+        self.lock_path = f"{database}.aggregates.lock"
+        self.check_interval = check_interval
+        self.checked = 0.0
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+
+    # Locking
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the write lock across threads and processes."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_file is None:
+                self._lock_file = open(self.lock_path, "a")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    # Segment access
+
+    def _attach(self) -> bool:
+        """
+        Attach to the segment, creating it if no process has yet.
+
+        A segment left behind with an older, smaller layout is replaced.
+
+        Returns:
+            bool: Whether the segment was created
+        """
+        try:
+            self.shm = open_segment(self.name)
+            if self.shm.size >= SEGMENT_SIZE:
+                return False
+            self.shm.close()
+            self.unlink()
+        except FileNotFoundError:
+            pass
+
+        self.shm = open_segment(self.name, SEGMENT_SIZE)
+        # Epochs carry on from the clock, so versions a client saw before the
+        # segment was recreated never look current
+        self._write_header(0, 0, time.time_ns() // 1000, 1, 0)
+        return True
+
+    def unlink(self) -> bool:
+        """
+        Remove the segment. Only safe while no worker is using it.
+
+        Returns:
+            bool: Whether there was a segment to remove
+        """
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+        try:
+            # Tracked, since unlink() takes it off the resource tracker again
+            shm = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return False
+        shm.close()
+        shm.unlink()
+        return True
+
+    def _header(self) -> Tuple[bytes, int, int, int, int, int]:
+        return HEADER.unpack_from(self.shm.buf, 0)
+
+    def _write_header(
+        self, sequence: int, version: int, epoch: int, dirty: int, outliers: int
+    ) -> None:
+        HEADER.pack_into(
+            self.shm.buf, 0, MAGIC, sequence, version, epoch, dirty, outliers
+        )
+
+    def _arrays(self) -> Tuple[memoryview, memoryview, memoryview]:
+        """Writable views of the sums, counts and wrongs arrays."""
+        arrays = []
+        for position in range(3):
+            offset = HEADER.size + position * ARRAY_SIZE
+            arrays.append(self.shm.buf[offset : offset + ARRAY_SIZE].cast("d"))
+        return arrays[0], arrays[1], arrays[2]
+
+    # Keeping the segment in step with SQLite
+
+    def open(self, cur: sqlite3.Cursor) -> None:
+        """
+        Attach to the segment and make sure it matches agg_pair.
+
+        Args:
+            cur (sqlite3.Cursor): Cursor on the database
+        """
+        with self._locked():
+            created = self._attach()
+            magic, _, _, _, dirty, _ = self._header()
+            if created or magic != MAGIC or dirty or not self._matches(cur):
+                self._rebuild(cur)
+            self.checked = time.monotonic()
+
+    def _matches(self, cur: sqlite3.Cursor) -> bool:
+        """Check the segment's totals and outliers flag against agg_pair."""
+        cur.execute(
+            f"""
+            SELECT COALESCE(SUM(CASE WHEN {IN_RANGE} THEN total_effective_time END), 0),
+                   COALESCE(SUM(CASE WHEN {IN_RANGE} THEN count END), 0),
+                   COALESCE(SUM(CASE WHEN {IN_RANGE} THEN wrong_count END), 0),
+                   COALESCE(SUM(CASE WHEN {IN_RANGE} THEN 0 ELSE 1 END), 0)
+            FROM agg_pair
+        """
+        )
+        total_time, count, wrong_count, outliers = cur.fetchone()
+        sums, counts, wrongs = self._arrays()
+        return (
+            bool(outliers) == bool(self._header()[5])
+            and count == sum(counts)
+            and wrong_count == sum(wrongs)
+            and abs(total_time - sum(sums)) <= 1e-6 * max(1.0, abs(total_time))
+        )
+
+    def _rebuild(self, cur: sqlite3.Cursor) -> None:
+        """Reload every cell from agg_pair. The caller holds the write lock."""
+        _, sequence, version, epoch, _, outliers = self._header()
+        self._write_header(sequence + 1, version, epoch, 1, outliers)
+
+        sums, counts, wrongs = self._arrays()
+        for index in range(CELLS):
+            sums[index] = counts[index] = wrongs[index] = 0.0
+
+        outliers = 0
+        cur.execute(
+            "SELECT a, b, total_effective_time, count, wrong_count FROM agg_pair"
+        )
+        for a, b, total_time, count, wrong_count in cur.fetchall():
+            index = cell_index(a, b)
+            if index is None:
+                outliers = 1
+                continue
+            sums[index] = total_time or 0.0
+            counts[index] = count or 0
+            wrongs[index] = wrong_count or 0
+
+        # A new epoch tells clients holding older versions to start over
+        self._write_header(sequence + 2, version + 1, epoch + 1, 0, outliers)
+
+    @contextmanager
+    def updating(self, cur: sqlite3.Cursor) -> Iterator[None]:
+        """
+        Hold the write lock while responses are committed and then added.
+
+        The segment stays marked dirty until the block finishes, so a worker
+        that fails between committing to SQLite and calling add() leaves it
+        to be rebuilt by the next writer.
+
+        Args:
+            cur (sqlite3.Cursor): Cursor the responses are written with
+        """
+        with self._locked():
+            _, sequence, version, epoch, dirty, outliers = self._header()
+            if dirty or (
+                time.monotonic() - self.checked > self.check_interval
+                and not self._matches(cur)
+            ):
+                self._rebuild(cur)
+                _, sequence, version, epoch, _, outliers = self._header()
+            self.checked = time.monotonic()
+
+            self._write_header(sequence, version, epoch, 1, outliers)
+            yield
+            _, sequence, version, epoch, _, outliers = self._header()
+            self._write_header(sequence, version, epoch, 0, outliers)
+
+    def add(self, answers: List[Tuple[Any, Any, float, bool]]) -> None:
+        """
+        Add committed answers to the aggregates, as agg_pair's trigger does.
+
+        Must be called inside updating().
+
+        Args:
+            answers (List[Tuple[Any, Any, float, bool]]): (a, b,
+                effective_time, correct) of each answer, with a and b as
+                SQLite stored them
+        """
+        _, sequence, version, epoch, dirty, outliers = self._header()
+        self._write_header(sequence + 1, version, epoch, dirty, outliers)
+
+        changed = 0
+        sums, counts, wrongs = self._arrays()
+        for a, b, effective_time, correct in answers:
+            index = cell_index(a, b)
+            if index is None:
+                # agg_pair's trigger has added it; heatmaps now read it there
+                outliers = 1
+                continue
+            sums[index] += effective_time
+            counts[index] += 1
+            if not correct:
+                wrongs[index] += 1
+            changed |= 1 << index
+
+        offset = CHANGES_OFFSET + (version + 1) % HISTORY * CHANGE_SIZE
+        CHANGE_VERSION.pack_into(self.shm.buf, offset, version + 1)
+        start = offset + CHANGE_VERSION.size
+        self.shm.buf[start : start + BITMAP_SIZE] = changed.to_bytes(
+            BITMAP_SIZE, "little"
+        )
+
+        self._write_header(sequence + 2, version + 1, epoch, dirty, outliers)
+
+    # Reading
+
+    def snapshot(self) -> Snapshot:
+        """
+        Copy the aggregates without taking the lock.
+
+        The copy is what lets a reader check that no write overlapped it,
+        and at under 30 KB it costs less than building the JSON cells.
+
+        Returns:
+            Snapshot: Epoch, version, copies of the three arrays and the
+                change history, and whether agg_pair has pairs outside them
+        """
+        for _ in range(MAX_READ_ATTEMPTS):
+            _, sequence, version, epoch, _, outliers = self._header()
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            data = bytes(self.shm.buf[HEADER.size : SEGMENT_SIZE])
+            if self._header()[1] == sequence:
+                arrays_size = 3 * ARRAY_SIZE
+                values = memoryview(data[:arrays_size]).cast("d").tolist()
+                return Snapshot(
+                    epoch,
+                    version,
+                    values[:CELLS],
+                    values[CELLS : 2 * CELLS],
+                    values[2 * CELLS :],
+                    data[arrays_size:],
+                    bool(outliers),
+                )
+        raise RuntimeError("Aggregates kept changing while being read")
+
+    @staticmethod
+    def changed_since(snapshot: Snapshot, version: int) -> Optional[Set[int]]:
+        """
+        Find the cells changed between a version and a snapshot.
+
+        Args:
+            snapshot (Snapshot): Current aggregates
+            version (int): Version of the same epoch the caller last saw
+
+        Returns:
+            Optional[Set[int]]: Positions of the changed cells, or None if
+                the version is not in the change history
+        """
+        if not 0 < version <= snapshot.version or snapshot.version - version >= HISTORY:
+            return None
+
+        changed = 0
+        for seen in range(version + 1, snapshot.version + 1):
+            offset = seen % HISTORY * CHANGE_SIZE
+            if CHANGE_VERSION.unpack_from(snapshot.changes, offset)[0] != seen:
+                return None
+            start = offset + CHANGE_VERSION.size
+            changed |= int.from_bytes(
+                snapshot.changes[start : start + BITMAP_SIZE], "little"
+            )
+        return {index for index in range(CELLS) if changed >> index & 1}
+
+    def heatmap_since(
+        self, epoch: Optional[int] = None, version: Optional[int] = None
+    ) -> Heatmap:
+        """
+        Build the /submit heatmap and world stats.
+
+        If the caller already holds the heatmap of an epoch and version
+        still in the change history, only the cells changed since then are
+        included, along with any pairs outside the segment.
+
+        Args:
+            epoch (Optional[int]): Epoch of the caller's heatmap
+            version (Optional[int]): Version of the caller's heatmap
+
+        Returns:
+            Heatmap: Cells keyed by "a_b" and world stats
+        """
+        snapshot = self.snapshot()
+
+        indices: Optional[Set[int]] = None
+        if (
+            isinstance(epoch, int)
+            and isinstance(version, int)
+            and epoch == snapshot.epoch
+        ):
+            indices = self.changed_since(snapshot, version)
+
+        cells = {}
+        for index, count in enumerate(snapshot.counts):
+            if count and (indices is None or index in indices):
+                a, b = divmod(index, MAX_FACTOR + 1)
+                cells[f"{a}_{b}"] = {
+                    "avg_effective": round(snapshot.sums[index] / count, 1),
+                    "count": int(count),
+                    "wrong_count": int(snapshot.wrongs[index]),
+                }
+
+        world_time = sum(snapshot.sums)
+        world_count = int(sum(snapshot.counts))
+        if snapshot.outliers:
+            for a, b, total_time, count, wrong_count in self.outliers():
+                if count:
+                    cells[f"{a}_{b}"] = {
+                        "avg_effective": round(total_time / count, 1),
+                        "count": count,
+                        "wrong_count": wrong_count,
+                    }
+                world_time += total_time or 0.0
+                world_count += count or 0
+
+        world_avg = world_time / world_count if world_count else 0
+        return Heatmap(
+            snapshot.epoch,
+            snapshot.version,
+            cells,
+            indices is not None,
+            world_avg,
+            world_count,
+        )
+
+    def outliers(self) -> List[Tuple[Any, Any, float, int, int]]:
+        """
+        Read the agg_pair rows outside the segment.
+
+        They are read without the write lock, so they may be a submission
+        ahead of or behind the snapshot they are added to.
+
+        Returns:
+            List[Tuple[Any, Any, float, int, int]]: (a, b, total effective
+                time, count, wrong count) of each pair
+        """
+        conn = sqlite3.connect(self.database, timeout=5)
+        try:
+            return conn.execute(
+                f"""
+                SELECT a, b, total_effective_time, count, wrong_count
+                FROM agg_pair
+                WHERE NOT ({IN_RANGE})
+            """
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def heatmap(self) -> Tuple[Dict[str, Dict[str, float]], float, int]:
+        """
+        Build the full /submit heatmap and world stats.
+
+        Returns:
+            Tuple[Dict[str, Dict[str, float]], float, int]: Heatmap keyed by
+                "a_b", world average effective time and world answer count
+        """
+        heatmap = self.heatmap_since()
+        return heatmap.cells, heatmap.world_avg, heatmap.world_count
+
+
+def main() -> int:
+    from storage import TIMES_TABLES, database_path
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Show or remove the shared pair aggregates of the times-tables database."
+        )
+    )
+    parser.add_argument(
+        "--unlink",
+        action="store_true",
+        help="remove the segment; only while the server is stopped",
+    )
+    args = parser.parse_args()
+
+    matrix = AggregateMatrix(database_path(TIMES_TABLES))
+    if args.unlink:
+        removed = matrix.unlink()
+        print(
+            f"Removed {matrix.name}" if removed else f"No segment named {matrix.name}"
+        )
+        return 0
+
+    try:
+        matrix.shm = open_segment(matrix.name)
+    except FileNotFoundError:
+        print(f"No segment named {matrix.name}")
+        return 1
+    magic, _, version, epoch, dirty, outliers = matrix._header()
+    print(
+        f"{matrix.name}: {magic.decode(errors='replace')}, epoch {epoch}, "
+        f"version {version}, dirty {dirty}, outliers {outliers}"
+    )
+    matrix.shm.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Fingerprinted static assets built by build_assets.py.
+
+The blueprint serves static/dist/ under /assets/ with year-long immutable
+caching, and gives templates asset_url() and asset_srcset(), which fall
+back to the plain static/ files when the assets were not built.
+"""
+
+import json
+import mimetypes
+import os
+from typing import Any, Dict, List
+
+from flask import Blueprint, abort, request, send_from_directory, url_for
+
+blueprint = Blueprint("assets", __name__)
+
+# Fingerprinted assets written by build_assets.py
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dist")
+ASSET_MANIFEST_FILE = os.path.join(ASSETS_DIR, "manifest.json")
+# Built asset names change with their content, so they can be cached for a year
+ASSET_MAX_AGE = 365 * 24 * 3600
+# File suffix of each pre-compressed variant, in order of preference
+ASSET_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def load_asset_manifest() -> Dict[str, Dict[str, Any]]:
+    """Load the build_assets.py manifest, or nothing if assets were not built."""
+    try:
+        with open(ASSET_MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+ASSET_MANIFEST = load_asset_manifest()
+# Content-Encodings available for every built file, including image variants
+ASSET_FILES: Dict[str, List[str]] = {}
+for asset in ASSET_MANIFEST.values():
+    ASSET_FILES[asset["path"]] = asset["encodings"]
+    for variant in asset.get("variants", []):
+        ASSET_FILES[variant["path"]] = []
+
+
+@blueprint.app_context_processor
+def asset_helpers() -> Dict[str, Any]:
+    """Make the asset URL helpers available to templates."""
+    return {"asset_url": asset_url, "asset_srcset": asset_srcset}
+
+
+def asset_url(filename: str) -> str:
+    """
+    Get the URL of a static file, preferring its fingerprinted build.
+
+    Args:
+        filename (str): File name within static/
+
+    Returns:
+        str: URL of the built asset, or of the plain static file if it was not built
+    """
+    asset = ASSET_MANIFEST.get(filename)
+    if asset is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.serve_asset", filename=asset["path"])
+
+
+def asset_srcset(filename: str) -> str:
+    """
+    Get a srcset of the resized WebP variants of a static image.
+
+    Args:
+        filename (str): Image file name within static/
+
+    Returns:
+        str: srcset attribute value, empty if no variants were built
+    """
+    variants = ASSET_MANIFEST.get(filename, {}).get("variants", [])
+    return ", ".join(
+        f"{url_for('assets.serve_asset', filename=variant['path'])} {variant['width']}w"
+        for variant in variants
+    )
+
+
+@blueprint.route("/assets/<path:filename>")
+def serve_asset(filename: str):
+    """
+    Serve a fingerprinted asset with immutable caching.
+
+    The pre-compressed variant the client accepts is served when there is one.
+
+    Args:
+        filename (str): Built asset name from the manifest
+
+    Returns:
+        The asset file response
+    """
+    encodings = ASSET_FILES.get(filename)
+    if encodings is None:
+        abort(404)
+
+    encoding = None
+    for candidate in ASSET_ENCODINGS:
+        if candidate in encodings and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+
+    response = send_from_directory(
+        ASSETS_DIR,
+        filename + ASSET_ENCODINGS.get(encoding, ""),
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=ASSET_MAX_AGE,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
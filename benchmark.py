@@ -0,0 +1,413 @@
+"""
+Benchmark the pizza ordering code on synthetic parties.
+
+Generates parties of increasing size with preferences drawn per
+ingredients.json category, times each stage of the summary pipeline, and
+scores the quality of the orders it produces. The summaries and a full
+/submit heatmap are also encoded and compressed the way responses are, to
+compare the JSON provider against the standard library and measure bytes on
+the wire. The report is written as JSON so runs can be compared by scripts.
+
+Usage:
+    python benchmark.py [--sizes 5,50,500] [--distribution vegetarian]
+                        [--repeat 3] [--seed 0] [--output report.json]
+
+A distribution is either one of DISTRIBUTIONS or an inline spec of
+CATEGORY:want:wont probabilities, e.g. "PROTEINS:0.3:0.05,*:0.1:0.1",
+where "*" covers every category not listed.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_SIZES = [5, 50, 500, 5000, 10000]
+
+# Probability that an attendee wants / won't eat each ingredient, per category
+DISTRIBUTIONS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "indifferent": {},
+    "uniform": {"*": (0.1, 0.1)},
+    "vegetarian": {"PROTEINS": (0.0, 0.9), "VEGETABLES": (0.2, 0.05)},
+    "meat-lovers": {"PROTEINS": (0.25, 0.02), "VEGETABLES": (0.05, 0.2)},
+    "picky": {"*": (0.05, 0.4)},
+}
+
+# Most "want" picks the eater form allows
+MAX_WANTS = 3
+
+# Attendees pick slices of these pizzas as well as their custom one
+SELECTABLE_PIZZAS = ["pepperoni", "cheese", "pineapple-ham", "custom_benchmark"]
+
+
+def parse_distribution(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse a distribution preset name or inline CATEGORY:want:wont spec.
+
+    Args:
+        spec (str): Preset name or comma-separated category specs
+
+    Returns:
+        Dict[str, Tuple[float, float]]: (want, wont) probability per category
+    """
+    if spec in DISTRIBUTIONS:
+        return DISTRIBUTIONS[spec]
+
+    distribution = {}
+    for part in spec.split(","):
+        category, want, wont = part.split(":")
+        distribution[category] = (float(want), float(wont))
+    return distribution
+
+
+def generate_party(
+    pizza_module: Any,
+    size: int,
+    distribution: Dict[str, Tuple[float, float]],
+    rng: random.Random,
+) -> Dict[str, Any]:
+    """
+    Generate a party in the shape pizza.load_parties() returns.
+
+    Args:
+        pizza_module: The imported pizza module
+        size (int): Number of attendees
+        distribution (Dict[str, Tuple[float, float]]): Preference probabilities
+        rng (random.Random): Random number generator
+
+    Returns:
+        Dict[str, Any]: Party data with attendees, sparse preferences,
+            selections and the raw per-attendee preferences
+    """
+    categories = pizza_module.INGREDIENTS_DATA.get("categories", {})
+    default = distribution.get("*", (0.0, 0.0))
+
+    attendees = []
+    selections = []
+    sparse_rows = []
+    attendee_preferences = {}
+
+    for attendee_id in range(1, size + 1):
+        preferences = {}
+        for category, ingredients in categories.items():
+            want, wont = distribution.get(category, default)
+            for ingredient in ingredients:
+                roll = rng.random()
+                if roll < want:
+                    preferences[ingredient] = 2
+                elif roll < want + wont:
+                    preferences[ingredient] = 0
+
+        # Respect the eater form's limit on "want" picks
+        wants = [ingredient for ingredient, pref in preferences.items() if pref == 2]
+        for ingredient in rng.sample(wants, max(0, len(wants) - MAX_WANTS)):
+            del preferences[ingredient]
+
+        slice_count = rng.randint(1, 4)
+        for _ in range(rng.randint(0, 2)):
+            pizza_type = rng.choice(SELECTABLE_PIZZAS)
+            selections.append((attendee_id, pizza_type, 1))
+            slice_count += 1
+
+        attendees.append((attendee_id, f"Attendee {attendee_id}", slice_count))
+        attendee_preferences[attendee_id] = preferences
+        sparse_rows.extend(
+            (attendee_id, ingredient, pref) for ingredient, pref in preferences.items()
+        )
+
+    return {
+        "attendees": attendees,
+        "selections": selections,
+        "sparse_rows": sparse_rows,
+        "attendee_preferences": attendee_preferences,
+    }
+
+
+def time_stage(function: Callable[[], Any], repeat: int) -> Tuple[Any, float]:
+    """Run a stage repeat times and return its last result and median milliseconds."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, round(statistics.median(timings), 3)
+
+
+def score_orders(
+    party: Dict[str, Any], pizza_orders: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Score how well a list of pizza orders serves a party.
+
+    Args:
+        party (Dict[str, Any]): Generated party data
+        pizza_orders (List[Dict[str, Any]]): Orders with slices, ingredients
+            and target_eaters
+
+    Returns:
+        Dict[str, Any]: Quality metrics:
+            - "uncovered_attendees": attendees who are not a target eater
+              of any pizza
+            - "wasted_slices" / "missing_slices": slices ordered beyond, or
+              short of, the slices requested
+            - "satisfied_wants": share of attendees with wants who are a
+              target eater of a pizza with one of their wanted ingredients
+    """
+    names = {attendee[1]: attendee[0] for attendee in party["attendees"]}
+    covered = set()
+    satisfied = set()
+
+    for order in pizza_orders:
+        for name in order["target_eaters"]:
+            attendee_id = names.get(name)
+            if attendee_id is None:
+                continue
+            covered.add(attendee_id)
+            preferences = party["attendee_preferences"][attendee_id]
+            if any(
+                preferences.get(ingredient) == 2 for ingredient in order["ingredients"]
+            ):
+                satisfied.add(attendee_id)
+
+    with_wants = [
+        attendee_id
+        for attendee_id, preferences in party["attendee_preferences"].items()
+        if 2 in preferences.values()
+    ]
+
+    requested = sum(attendee[2] for attendee in party["attendees"])
+    ordered = sum(order["slices"] for order in pizza_orders)
+
+    return {
+        "uncovered_attendees": len(names) - len(covered),
+        "wasted_slices": max(0, ordered - requested),
+        "missing_slices": max(0, requested - ordered),
+        "satisfied_wants": (
+            round(len(satisfied.intersection(with_wants)) / len(with_wants), 4)
+            if with_wants
+            else None
+        ),
+    }
+
+
+def benchmark_serialization(app_module: Any, data: Any, repeat: int) -> Dict[str, Any]:
+    """
+    Time encoding and compressing a response payload, and measure its size.
+
+    Args:
+        app_module: The imported app module
+        data (Any): Response payload
+        repeat (int): Runs per stage; the median is reported
+
+    Returns:
+        Dict[str, Any]: Timings in milliseconds and sizes in bytes of the
+            stdlib encoder, the app's JSON provider and each compression
+    """
+    provider = app_module.app.json
+    timings = {}
+
+    _, timings["encode_stdlib"] = time_stage(
+        lambda: json.dumps(
+            data, default=provider.default, sort_keys=True, separators=(",", ":")
+        ).encode(),
+        repeat,
+    )
+    body, timings["encode_provider"] = time_stage(
+        lambda: provider.dumps_bytes(data), repeat
+    )
+    compressed, timings["compress_gzip"] = time_stage(
+        lambda: gzip.compress(body, app_module.COMPRESSION_GZIP_LEVEL), repeat
+    )
+    sizes = {"json": len(body), "gzip": len(compressed)}
+
+    if app_module.brotli is not None:
+        compressed, timings["compress_br"] = time_stage(
+            lambda: app_module.brotli.compress(
+                body, quality=app_module.COMPRESSION_BROTLI_QUALITY
+            ),
+            repeat,
+        )
+        sizes["br"] = len(compressed)
+
+    return {
+        "encoder": "orjson" if provider.use_orjson else "stdlib",
+        "timings_ms": timings,
+        "bytes": sizes,
+    }
+
+
+def synthetic_heatmap(rng: random.Random) -> Dict[str, Any]:
+    """Build a /submit response with every cell of the times table answered."""
+    heatmap = {}
+    for a in range(1, 13):
+        for b in range(1, 13):
+            count = rng.randint(1, 500)
+            heatmap[f"{a}_{b}"] = {
+                "avg_effective": round(rng.uniform(1, 12), 1),
+                "count": count,
+                "wrong_count": rng.randint(0, count // 4),
+            }
+    return {
+        "heatmap": heatmap,
+        "user_avg": 3.2,
+        "user_count": 40,
+        "world_avg": 4.7,
+        "world_count": 36000,
+    }
+
+
+def benchmark_party(
+    app_module: Any, pizza_module: Any, party: Dict[str, Any], repeat: int
+) -> Dict[str, Any]:
+    """
+    Time every stage of the summary pipeline for one party and score its output.
+
+    Args:
+        app_module: The imported app module
+        pizza_module: The imported pizza module
+        party (Dict[str, Any]): Generated party data
+        repeat (int): Runs per stage; the median is reported
+
+    Returns:
+        Dict[str, Any]: Stage timings in milliseconds and quality scores
+    """
+    attendees = party["attendees"]
+    attendee_ids = [attendee[0] for attendee in attendees]
+    timings = {}
+
+    preferences_data, timings["expand_preferences"] = time_stage(
+        lambda: pizza_module.expand_preferences(attendee_ids, party["sparse_rows"]),
+        repeat,
+    )
+    preference_keys, timings["encode_preferences"] = time_stage(
+        lambda: {
+            attendee_id: pizza_module.encode_preferences(preferences)
+            for attendee_id, preferences in party["attendee_preferences"].items()
+        },
+        repeat,
+    )
+
+    ingredient_scores: Dict[str, List[int]] = {}
+    for _, ingredient, preference in preferences_data:
+        ingredient_scores.setdefault(ingredient, []).append(preference)
+
+    pizza_orders, timings["calculate_pizza_orders"] = time_stage(
+        lambda: pizza_module.calculate_pizza_orders(
+            attendees, ingredient_scores, preferences_data
+        ),
+        repeat,
+    )
+
+    custom_pizzas = [("custom_benchmark", "Benchmark", ["pepperoni"])]
+    comprehensive_orders, timings["calculate_comprehensive_pizza_orders"] = time_stage(
+        lambda: pizza_module.calculate_comprehensive_pizza_orders(
+            attendees, preferences_data, party["selections"], custom_pizzas
+        ),
+        repeat,
+    )
+
+    total_slices = sum(attendee[2] for attendee in attendees)
+    _, timings["format_pizza_count"] = time_stage(
+        lambda: [
+            pizza_module.format_pizza_count(slices)
+            for slices in range(1, total_slices + 1)
+        ],
+        repeat,
+    )
+
+    loaded_party = {
+        "attendees": attendees,
+        "preferences_data": preferences_data,
+        "selections": party["selections"],
+        "preference_keys": preference_keys,
+    }
+    summary, timings["summarize_party"] = time_stage(
+        lambda: pizza_module.summarize_party("BNCH", loaded_party, custom_pizzas),
+        repeat,
+    )
+
+    return {
+        "timings_ms": timings,
+        "quality": {
+            "pizza_orders": score_orders(party, pizza_orders),
+            "comprehensive_pizza_orders": score_orders(party, comprehensive_orders),
+            "preference_collections": len(summary["preference_collections"]),
+        },
+        "serialization": benchmark_serialization(app_module, summary, repeat),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma-separated party sizes",
+    )
+    parser.add_argument(
+        "--distribution",
+        action="append",
+        help="preset name or CATEGORY:want:wont spec (repeatable)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    distributions = args.distribution or ["uniform", "vegetarian", "meat-lovers"]
+
+    # Keep any databases the app creates away from the real ones
+    with tempfile.TemporaryDirectory() as scratch:
+        for variable in ("DATABASE", "TIMES_TABLES_DATABASE", "PIZZA_DATABASE"):
+            os.environ[variable] = os.path.join(scratch, f"{variable.lower()}.db")
+        import app as app_module
+        import pizza as pizza_module
+    # The pizza app loads its ingredients on its first request, so load them now
+    pizza_module.refresh_ingredients()
+
+    results = []
+    for spec in distributions:
+        distribution = parse_distribution(spec)
+        for size in sizes:
+            rng = random.Random(f"{args.seed}-{spec}-{size}")
+            party = generate_party(pizza_module, size, distribution, rng)
+            result = benchmark_party(app_module, pizza_module, party, args.repeat)
+            results.append({"distribution": spec, "size": size, **result})
+            print(
+                f"{spec:>12} {size:>6} attendees: "
+                f"{result['timings_ms']['summarize_party']:>10.3f} ms summary",
+                file=sys.stderr,
+            )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+        "heatmap_serialization": benchmark_serialization(
+            app_module, synthetic_heatmap(random.Random(args.seed)), args.repeat
+        ),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Build fingerprinted copies of the static assets for long-lived caching.
+
+Every file in static/ is copied to static/dist/ under a name that includes a
+hash of its content, so a changed file always gets a new URL and browsers
+can cache the old one forever. Text assets also get gzip (and, when the
+brotli package is installed, brotli) variants, and images get resized WebP
+variants for srcset when Pillow is installed. static/dist/manifest.json maps
+each source file to its built files; app.py reads it at startup and falls
+back to the plain static files for anything missing from it.
+
+Usage:
+    python build_assets.py [--clean]
+
+Run it after changing anything in static/ and before restarting gunicorn.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, List
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: images are only fingerprinted without it
+    Image = None
+
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_FILE = os.path.join(DIST_DIR, "manifest.json")
+
+# Assets worth compressing; images already are
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+# Widths of the WebP variants offered in srcset
+IMAGE_WIDTHS = [480, 960, 1600]
+WEBP_QUALITY = 80
+HASH_LENGTH = 10
+
+
+def fingerprinted_name(filename: str, content: bytes, suffix: str = "") -> str:
+    """
+    Insert a content hash into a file name.
+
+    Args:
+        filename (str): Source file name, e.g. "styles.css"
+        content (bytes): File content the hash is taken from
+        suffix (str): Text to put after the hash instead of the extension
+
+    Returns:
+        str: Name like "styles.1a2b3c4d5e.css"
+    """
+    stem, extension = os.path.splitext(filename)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{suffix or extension}"
+
+
+def write_file(path: str, content: bytes) -> None:
+    """Write a file atomically so a running app never serves half of it."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def build_compressed(path: str, content: bytes) -> List[str]:
+    """
+    Write the compressed variants of a built asset next to it.
+
+    A variant is only kept when it is smaller than the asset itself.
+
+    Args:
+        path (str): Path of the built asset
+        content (bytes): Its content
+
+    Returns:
+        List[str]: Content-Encodings available, best first
+    """
+    variants = []
+    if brotli is not None:
+        variants.append(("br", ".br", brotli.compress(content, quality=11)))
+    variants.append(("gzip", ".gz", gzip.compress(content, compresslevel=9, mtime=0)))
+
+    encodings = []
+    for encoding, extension, compressed in variants:
+        if len(compressed) < len(content):
+            write_file(path + extension, compressed)
+            encodings.append(encoding)
+    return encodings
+
+
+def build_image_variants(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """
+    Write resized WebP variants of an image.
+
+    Args:
+        filename (str): Source file name
+        content (bytes): Source image content
+
+    Returns:
+        List[Dict[str, Any]]: Built variants with "path" and "width", narrowest first
+    """
+    if Image is None:
+        return []
+
+    image = Image.open(io.BytesIO(content))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    widths = [width for width in IMAGE_WIDTHS if width < image.width] + [image.width]
+    variants = []
+    for width in widths:
+        height = round(image.height * width / image.width)
+        output = io.BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(
+            output, "WEBP", quality=WEBP_QUALITY
+        )
+        name = fingerprinted_name(filename, content, f".{width}w.webp")
+        write_file(os.path.join(DIST_DIR, name), output.getvalue())
+        variants.append({"path": name, "width": width})
+    return variants
+
+
+def build_assets() -> Dict[str, Dict[str, Any]]:
+    """
+    Build every file in static/ into static/dist/ and write the manifest.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The manifest, keyed by source file name
+    """
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {}
+
+    for filename in sorted(os.listdir(STATIC_DIR)):
+        source = os.path.join(STATIC_DIR, filename)
+        if not os.path.isfile(source):
+            continue
+
+        with open(source, "rb") as f:
+            content = f.read()
+
+        name = fingerprinted_name(filename, content)
+        path = os.path.join(DIST_DIR, name)
+        write_file(path, content)
+
+        extension = os.path.splitext(filename)[1].lower()
+        entry: Dict[str, Any] = {"path": name, "encodings": []}
+        if extension in COMPRESSIBLE_EXTENSIONS:
+            entry["encodings"] = build_compressed(path, content)
+        if extension in IMAGE_EXTENSIONS:
+            entry["variants"] = build_image_variants(filename, content)
+        manifest[filename] = entry
+
+    # Written last, so the app never sees a manifest naming unbuilt files
+    write_file(MANIFEST_FILE, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="remove previously built files first (breaks pages already open)",
+    )
+    args = parser.parse_args()
+
+    if args.clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    manifest = build_assets()
+    for filename, entry in manifest.items():
+        details = entry["encodings"] + [
+            f"{variant['width']}w" for variant in entry.get("variants", [])
+        ]
+        print(f"{filename} -> {entry['path']} {' '.join(details)}".rstrip())
+
+    if brotli is None:
+        print("brotli is not installed; built gzip variants only.")
+    if Image is None:
+        print("Pillow is not installed; built no resized image variants.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
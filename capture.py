@@ -0,0 +1,102 @@
+"""
+Opt-in recorder of live traffic, for replaying with replay.py.
+
+Set CAPTURE_DIR to record every /submit and /pizza/* request to NDJSON
+files in that directory, one file per worker process. Each line holds the
+request's arrival time, method, path, matched route, JSON body and
+Accept-Encoding, along with the status and time taken to serve it. Lines
+are written by a background listener fed through a bounded queue, like log
+records, so recording adds no file I/O to the request thread; when the
+queue is full, requests go unrecorded.
+
+Captured bodies include user ids and attendee names, so keep the files
+private.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Optional
+
+from flask import Request, Response
+
+from structured_logging import StructuredQueueHandler, get_logger
+
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR", "")
+# Requests recorded, by path prefix
+CAPTURE_PREFIXES = ("/submit", "/pizza/")
+CAPTURE_QUEUE_SIZE = int(os.environ.get("CAPTURE_QUEUE_SIZE", "10000"))
+
+LISTENER: Optional[logging.handlers.QueueListener] = None
+
+log = get_logger("capture")
+
+
+class CaptureFormatter(logging.Formatter):
+    """Format a captured request as one compact JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.fields, separators=(",", ":"), default=str)
+
+
+def configure_capture() -> None:
+    """
+    Start recording to CAPTURE_DIR, if it is set.
+
+    Safe to call more than once; only the first call configures anything.
+    """
+    global LISTENER
+    if not CAPTURE_DIR or LISTENER is not None:
+        return
+
+    os.makedirs(CAPTURE_DIR, exist_ok=True)
+    path = os.path.join(
+        CAPTURE_DIR, f"capture-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.ndjson"
+    )
+    file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(CaptureFormatter())
+
+    capture_queue: queue.Queue = queue.Queue(CAPTURE_QUEUE_SIZE)
+    logger = logging.getLogger("capture")
+    logger.setLevel(logging.INFO)
+    # Captured requests never mix with the application log
+    logger.propagate = False
+    logger.addHandler(StructuredQueueHandler(capture_queue))
+
+    LISTENER = logging.handlers.QueueListener(capture_queue, file_handler)
+    LISTENER.start()
+    atexit.register(LISTENER.stop)
+
+
+def capture_request(request: Request, response: Response, started: float) -> None:
+    """
+    Record a served request, if capturing is on and the path is captured.
+
+    Args:
+        request (Request): The request
+        response (Response): The response sent for it
+        started (float): time.perf_counter() when the request arrived
+    """
+    if LISTENER is None or not request.path.startswith(CAPTURE_PREFIXES):
+        return
+
+    duration = time.perf_counter() - started
+    path = request.path
+    if request.query_string:
+        path += "?" + request.query_string.decode("latin-1")
+
+    log.info(
+        "request",
+        t=round(time.time() - duration, 3),
+        method=request.method,
+        path=path,
+        route=request.url_rule.rule if request.url_rule else None,
+        body=request.get_json(silent=True),
+        encoding=request.headers.get("Accept-Encoding"),
+        status=response.status_code,
+        ms=round(duration * 1000, 2),
+    )
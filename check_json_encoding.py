@@ -0,0 +1,215 @@
+"""
+Check that orjson and the standard library encode the app's responses alike.
+
+Every JSON route is exercised against scratch databases, including
+non-ASCII names, while the data each response serializes is recorded.
+Each payload is then encoded by FastJSONProvider with both encoders, and
+the script exits non-zero if the two outputs do not parse to the same
+values, or if either is not strict JSON (NaN, Infinity).
+
+Usage:
+    python check_json_encoding.py [-v]
+"""
+
+import json
+import os
+import sys
+import tempfile
+from typing import Any, List, Tuple
+
+# Environment variables naming the app's database files, pointed at scratch
+# copies while checking
+DATABASE_VARIABLES = {
+    "DATABASE": "data.db",
+    "TIMES_TABLES_DATABASE": "times_tables.db",
+    "PIZZA_DATABASE": "pizza.db",
+}
+
+# Payloads no route produces today, which the encoders must still agree on
+EDGE_CASES: List[Tuple[str, Any]] = [
+    ("non-finite floats", {"avg": float("nan"), "max": float("inf"), "min": -1e16}),
+    ("non-ASCII text", {"name": "Ñapolitana für Zoë 🍕"}),
+    ("floats", [0.1, 1 / 3, 2.5e-7, 1e16, 123456789.125]),
+]
+
+
+def reject_constant(name: str) -> None:
+    """Refuse the NaN and Infinity literals json.loads() accepts by default."""
+    raise ValueError(f"not strict JSON: {name}")
+
+
+def record_payloads() -> List[Tuple[str, Any]]:
+    """
+    Exercise the JSON routes of the app and return what they serialized.
+
+    Returns:
+        List[Tuple[str, Any]]: Path of each request and the data of every
+            JSON body built while serving it
+    """
+    # Keep the background threads from writing while the routes run
+    os.environ["SNAPSHOT_INTERVAL"] = "0"
+    os.environ["RETENTION_INTERVAL"] = "0"
+
+    import app as app_module
+    import pizza
+
+    provider = app_module.app.json
+    payloads: List[Tuple[str, Any]] = []
+    dumps_bytes = provider.dumps_bytes
+
+    def recording_dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+        payloads.append((path, obj))
+        return dumps_bytes(obj, indent)
+
+    provider.dumps_bytes = recording_dumps_bytes
+    client = app_module.app.test_client()
+    pizza.initialize()
+    ingredients = pizza.PIZZA_INGREDIENTS[:3]
+
+    requests = [
+        (
+            "POST",
+            "/pizza/create",
+            {"pizzaName": "Ñapolitana", "ingredients": ingredients},
+        ),
+        (
+            "POST",
+            "/pizza/create",
+            {"pizzaName": "Plain", "ingredients": ingredients[:1]},
+        ),
+    ]
+    for name in ["Evelyn", "Zoë", "Łukasz", "Sam"]:
+        requests.append(
+            (
+                "POST",
+                "/pizza/join",
+                {
+                    "partyNumber": "JSON",
+                    "name": name,
+                    "custom_pizza": {
+                        "sliceCount": 3,
+                        "preferences": {ingredient: 2 for ingredient in ingredients},
+                    },
+                    "existingPizza_slicesWanted": {
+                        "pepperoni": 1,
+                        "custom_ñapolitana": 1,
+                    },
+                },
+            )
+        )
+    requests += [
+        ("GET", "/pizza/summary/JSON", None),
+        ("POST", "/pizza/summaries", {"party_ids": ["JSON", "NONE"], "combined": True}),
+        ("GET", "/pizza/ingredients", None),
+        ("GET", "/pizza/available", None),
+    ]
+    for user_id, answers in [("ünïcode", 30), ("json", 60)]:
+        requests.append(
+            (
+                "POST",
+                "/submit",
+                {
+                    "user_id": user_id,
+                    "heatmap_version": 0,
+                    "responses": [
+                        {
+                            "a": 1 + index % 12,
+                            "b": 1 + index * 7 % 12,
+                            "user_answer": (1 + index % 12) * (1 + index * 7 % 12),
+                            "correct": index % 5 != 0,
+                            "time_taken": 1 + index / 7,
+                            "effective_time": 1 + index / 7,
+                        }
+                        for index in range(answers)
+                    ],
+                },
+            )
+        )
+    requests.append(("POST", "/submit", {"user_id": "json", "responses": []}))
+
+    for method, path, body in requests:
+        # Encoded here, so the test client does not record request bodies
+        client.open(
+            path,
+            method=method,
+            data=None if body is None else json.dumps(body),
+            content_type="application/json",
+        )
+
+    provider.dumps_bytes = dumps_bytes
+    return payloads
+
+
+def remove_aggregates() -> None:
+    """Remove the scratch database's shared aggregates, which outlive the script."""
+    import times_tables
+
+    times_tables.AGGREGATES.unlink()
+
+
+def encode_both(provider, obj: Any) -> Tuple[bytes, bytes]:
+    """Encode a payload with orjson and with the standard library."""
+    use_orjson = provider.use_orjson
+    try:
+        provider.use_orjson = True
+        fast = provider.dumps_bytes(obj)
+        provider.use_orjson = False
+        standard = provider.dumps_bytes(obj)
+    finally:
+        provider.use_orjson = use_orjson
+    return fast, standard
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv[1:]
+
+    import json_provider
+
+    if json_provider.orjson is None:
+        print("orjson is not installed, so only the standard library is used.")
+        return 0
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for variable, filename in DATABASE_VARIABLES.items():
+            os.environ[variable] = os.path.join(scratch, filename)
+        # Name the shared aggregates after the scratch database
+        os.environ.pop("AGGREGATE_SHM_NAME", None)
+        try:
+            payloads = record_payloads() + EDGE_CASES
+        finally:
+            remove_aggregates()
+
+        import app as app_module
+
+        provider = app_module.app.json
+        failures = 0
+        identical = 0
+
+        for label, obj in payloads:
+            fast, standard = encode_both(provider, obj)
+            try:
+                same = json.loads(fast, parse_constant=reject_constant) == json.loads(
+                    standard, parse_constant=reject_constant
+                )
+            except ValueError:
+                same = False
+            if not same:
+                failures += 1
+                print(f"FAIL: {label}")
+                print(f"    orjson: {fast[:200]!r}")
+                print(f"    stdlib: {standard[:200]!r}")
+            else:
+                identical += fast == standard
+                if verbose:
+                    status = "OK" if fast == standard else "OK (same values)"
+                    print(f"{status}: {label} ({len(fast)} bytes)")
+
+    print(
+        f"Checked {len(payloads)} payloads, {identical} byte-identical, "
+        f"{failures} that differ."
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Check the query plans of the statements app.py runs.
+
+Every route is exercised against scratch databases while the SQL the app
+executes is recorded, along with the database it ran on. Each statement is
+then run through EXPLAIN QUERY PLAN, and the script exits non-zero if any of
+them scans one of LARGE_TABLES or has to build an automatic index on one.
+
+Usage:
+    python check_query_plans.py [-v]
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+# Tables that grow with traffic and must only be reached through an index
+LARGE_TABLES = {
+    "responses",
+    "agg_user",
+    "agg_user_pair",
+    "pizza_attendees",
+    "pizza_preferences",
+    "pizza_selections",
+    "named_pizzas",
+    "named_pizzas_ingredients",
+}
+
+# Environment variables naming the app's database files, pointed at scratch
+# copies while checking
+DATABASE_VARIABLES = {
+    "DATABASE": "data.db",
+    "TIMES_TABLES_DATABASE": "times_tables.db",
+    "PIZZA_DATABASE": "pizza.db",
+}
+
+# Statements that are allowed to scan a large table, keyed by a fragment of
+# their SQL, with the reason
+ALLOWED_SCANS: Dict[str, str] = {
+    "HAVING MAX(timestamp) < datetime('now'": (
+        "retention finds expired parties once per interval, in the background"
+    ),
+}
+
+TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE
+)
+SQL_KEYWORDS = {
+    "where",
+    "join",
+    "left",
+    "inner",
+    "on",
+    "group",
+    "order",
+    "limit",
+    "set",
+}
+
+
+def record_statements() -> List[Tuple[str, str]]:
+    """
+    Exercise every route of the app and a retention pass, and return the
+    SQL they executed.
+
+    Returns:
+        List[Tuple[str, str]]: Database file and statement of everything
+            executed, in order, with parameters expanded
+    """
+    statements: List[Tuple[str, str]] = []
+    connect = sqlite3.connect
+
+    def traced_connect(database, *args, **kwargs) -> sqlite3.Connection:
+        conn = connect(database, *args, **kwargs)
+        conn.set_trace_callback(lambda sql: statements.append((database, sql)))
+        return conn
+
+    sqlite3.connect = traced_connect
+    # Take the pizza snapshot below rather than from a background thread
+    os.environ["SNAPSHOT_INTERVAL"] = "0"
+    try:
+        import app as app_module
+        import pizza
+        import retention
+        import snapshots
+        import times_tables
+        from storage import PIZZA
+
+        # Create the databases, which the app otherwise does on first request,
+        # so the snapshot has the schema
+        pizza.initialize()
+        times_tables.initialize()
+        snapshots.refresh_snapshot(PIZZA)
+
+        # Only check the queries the routes run, not the startup migrations
+        statements.clear()
+
+        client = app_module.app.test_client()
+        ingredients = pizza.PIZZA_INGREDIENTS[:3]
+
+        client.post(
+            "/pizza/create", json={"pizzaName": "Plan", "ingredients": ingredients}
+        )
+        for name in ["Evelyn", "Stephen", "Sam", "Sam"]:
+            client.post(
+                "/pizza/join",
+                json={
+                    "partyNumber": "PLAN",
+                    "name": name,
+                    "custom_pizza": {
+                        "sliceCount": 2,
+                        "preferences": {ingredient: 2 for ingredient in ingredients},
+                    },
+                    "existingPizza_slicesWanted": {"pepperoni": 1, "custom_1": 1},
+                },
+            )
+        client.get("/pizza/summary/PLAN")
+        client.post(
+            "/pizza/summaries", json={"party_ids": ["PLAN", "NONE"], "combined": True}
+        )
+        client.get("/pizza/ingredients")
+        client.get("/pizza/available")
+        client.get("/pizza/available?cursor=2&limit=5")
+        client.get(f"/pizza/available?q=Pla&exclude={ingredients[0]}")
+        submitted = client.post(
+            "/submit",
+            json={
+                "user_id": "plan",
+                "responses": [
+                    {
+                        "a": 6,
+                        "b": 8,
+                        "user_answer": 48,
+                        "correct": True,
+                        "time_taken": 1.0,
+                        "effective_time": 1.0,
+                    }
+                ],
+            },
+        )
+        client.get("/heatmap.png")
+        client.get(f"/heatmap.png?user={submitted.get_json()['share_id']}")
+        client.get("/heatmap.png?user=nobody")
+        retention.run_retention()
+    finally:
+        sqlite3.connect = connect
+
+    return statements
+
+
+def remove_aggregates() -> None:
+    """Remove the scratch database's shared aggregates, which outlive the script."""
+    import times_tables
+
+    times_tables.AGGREGATES.unlink()
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """Map every table name and alias referenced by a statement to its table."""
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def find_violations(conn: sqlite3.Connection, sql: str) -> Tuple[List[str], List[str]]:
+    """
+    Explain a statement and report the plan steps that touch large tables badly.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the scratch database
+        sql (str): Statement to explain
+
+    Returns:
+        Tuple[List[str], List[str]]: All plan steps and the offending ones
+    """
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    aliases = table_aliases(sql)
+
+    violations = []
+    for step in plan:
+        match = re.match(r"(SCAN|SEARCH) (\w+)", step)
+        if not match:
+            continue
+        operation, name = match.groups()
+        if aliases.get(name, name) not in LARGE_TABLES:
+            continue
+        if operation == "SCAN" or "AUTOMATIC" in step:
+            violations.append(step)
+
+    return plan, violations
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv[1:]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for variable, filename in DATABASE_VARIABLES.items():
+            os.environ[variable] = os.path.join(scratch, filename)
+        # Name the shared aggregates after the scratch database
+        os.environ.pop("AGGREGATE_SHM_NAME", None)
+        try:
+            statements = record_statements()
+        finally:
+            remove_aggregates()
+
+        connections: Dict[str, sqlite3.Connection] = {}
+        seen = set()
+        failures = 0
+
+        for database, statement in statements:
+            sql = " ".join(statement.split())
+            if sql in seen or not re.match(r"(SELECT|UPDATE|DELETE|INSERT)\b", sql):
+                continue
+            seen.add(sql)
+
+            if database not in connections:
+                # Snapshots are opened by URI
+                connections[database] = sqlite3.connect(database, uri=True)
+            plan, violations = find_violations(connections[database], sql)
+            allowed = [
+                reason for fragment, reason in ALLOWED_SCANS.items() if fragment in sql
+            ]
+            if violations and not allowed:
+                failures += 1
+                print(f"FAIL: {sql}")
+                for step in violations:
+                    print(f"    {step}")
+            elif verbose:
+                status = f"ALLOWED ({allowed[0]})" if violations else "OK"
+                print(f"{status}: {sql}")
+                for step in plan:
+                    print(f"    {step}")
+
+        for conn in connections.values():
+            conn.close()
+
+    print(f"Checked {len(seen)} statements, {failures} with table scans.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
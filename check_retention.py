@@ -0,0 +1,114 @@
+"""
+Check that expired pizza parties stop being served from the summary cache.
+
+A party is joined against scratch databases and its summary fetched, so
+that SUMMARY_CACHE holds it, then its attendees are backdated and a
+retention pass run. The script exits non-zero unless /pizza/summary/<id>
+then answers 404. This is done for a party joined now and for one from
+before pizza_parties, which has no version row.
+
+Usage:
+    python check_retention.py [-v]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Environment variables naming the app's database files, pointed at scratch
+# copies while checking
+DATABASE_VARIABLES = {
+    "DATABASE": "data.db",
+    "TIMES_TABLES_DATABASE": "times_tables.db",
+    "PIZZA_DATABASE": "pizza.db",
+}
+
+
+def expire_party(party_id: str, legacy: bool, verbose: bool) -> bool:
+    """
+    Join a party, cache its summary, expire it and check the summary is gone.
+
+    Args:
+        party_id (str): 4-character party identifier to use
+        legacy (bool): Remove the party's pizza_parties row, as a party
+            joined before that table existed would have none
+        verbose (bool): Print each step's result
+
+    Returns:
+        bool: Whether the summary answered 404 after the retention pass
+    """
+    import app as app_module
+    import retention
+    from storage import PIZZA, database_path
+
+    client = app_module.app.test_client()
+    client.open(
+        "/pizza/join",
+        method="POST",
+        data=json.dumps(
+            {
+                "partyNumber": party_id,
+                "name": "Ann",
+                "custom_pizza": {"sliceCount": 2, "preferences": {}},
+                "existingPizza_slicesWanted": {"pepperoni": 1},
+            }
+        ),
+        content_type="application/json",
+    )
+
+    conn = sqlite3.connect(database_path(PIZZA))
+    if legacy:
+        conn.execute("DELETE FROM pizza_parties WHERE party_number = ?", (party_id,))
+        conn.commit()
+
+    before = client.get(f"/pizza/summary/{party_id}")
+    # Cached now; the second fetch must be served from SUMMARY_CACHE
+    cached = client.get(f"/pizza/summary/{party_id}")
+
+    conn.execute(
+        """
+        UPDATE pizza_attendees SET timestamp = datetime('now', ?)
+        WHERE party_number = ?
+    """,
+        (f"-{retention.PIZZA_PARTY_RETENTION_DAYS + 1} days", party_id),
+    )
+    conn.commit()
+    conn.close()
+
+    stats = retention.run_retention()
+    after = client.get(f"/pizza/summary/{party_id}")
+
+    if verbose:
+        print(
+            f"{party_id}: {before.status_code}, cached {cached.status_code}, "
+            f"{stats['attendees_deleted']} attendees deleted, "
+            f"then {after.status_code}"
+        )
+    return before.status_code == 200 and after.status_code == 404
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv[1:]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for variable, filename in DATABASE_VARIABLES.items():
+            os.environ[variable] = os.path.join(scratch, filename)
+        # Keep the background threads from writing while the check runs
+        os.environ["SNAPSHOT_INTERVAL"] = "0"
+        os.environ["RETENTION_INTERVAL"] = "0"
+        os.environ["PIZZA_PARTY_RETENTION_DAYS"] = "90"
+
+        failures = 0
+        for party_id, legacy in [("NEW1", False), ("OLD1", True)]:
+            if not expire_party(party_id, legacy, verbose):
+                failures += 1
+                print(f"FAIL: {party_id} is still served after it expired")
+
+    print(f"Expired 2 parties, {failures} still served.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+-- Pizza party attendees
+CREATE TABLE IF NOT EXISTS pizza_attendees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    party_number TEXT NOT NULL,
+    name TEXT NOT NULL,
+    slice_count INTEGER NOT NULL,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Pizza ingredient preferences (only non-default values are stored)
+CREATE TABLE IF NOT EXISTS pizza_preferences (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attendee_id INTEGER NOT NULL,
+    ingredient TEXT NOT NULL,
+    preference INTEGER NOT NULL, -- 0: will not eat, 1: indifferent, 2: want to eat
+    FOREIGN KEY (attendee_id) REFERENCES pizza_attendees (id) ON DELETE CASCADE
+);
+
+-- Named pizzas created for all parties
+CREATE TABLE IF NOT EXISTS named_pizzas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ingredients for named pizzas
+CREATE TABLE IF NOT EXISTS named_pizzas_ingredients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pizza_id INTEGER NOT NULL,
+    ingredient TEXT NOT NULL,
+    FOREIGN KEY (pizza_id) REFERENCES named_pizzas (id) ON DELETE CASCADE
+);
+
+-- Existing pizza selections by attendees
+CREATE TABLE IF NOT EXISTS pizza_selections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attendee_id INTEGER NOT NULL,
+    pizza_type TEXT NOT NULL,
+    slice_count INTEGER NOT NULL,
+    FOREIGN KEY (attendee_id) REFERENCES pizza_attendees (id) ON DELETE CASCADE
+);
+
+-- Per-party summary version, bumped whenever a party's summary inputs change
+CREATE TABLE IF NOT EXISTS pizza_parties (
+    party_number TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Trigger to bump the party version when a new attendee joins
+CREATE TRIGGER IF NOT EXISTS trg_pizza_attendee_insert_version
+AFTER INSERT ON pizza_attendees
+BEGIN
+    -- Make sure the party has a version row.
+    INSERT OR IGNORE INTO pizza_parties (party_number, version)
+      VALUES (NEW.party_number, 0);
+
+    UPDATE pizza_parties
+      SET version = version + 1
+      WHERE party_number = NEW.party_number;
+END;
+
+-- Trigger to bump the party version when an attendee is removed
+CREATE TRIGGER IF NOT EXISTS trg_pizza_attendee_delete_version
+AFTER DELETE ON pizza_attendees
+BEGIN
+    -- Make sure the party has a version row.
+    INSERT OR IGNORE INTO pizza_parties (party_number, version)
+      VALUES (OLD.party_number, 0);
+
+    UPDATE pizza_parties
+      SET version = version + 1
+      WHERE party_number = OLD.party_number;
+END;
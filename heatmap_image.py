@@ -0,0 +1,216 @@
+"""
+PNG renders of the times-tables heatmap, for link previews and sharing.
+
+Images are drawn with the same colour scale as getColor() in
+static/script.js: each cell runs from green for the fastest pair to red
+for the slowest, and pairs nobody has answered are light grey. The PNG is
+written with zlib and struct, so no imaging library is needed.
+"""
+
+import hashlib
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+# Rows and columns of the grid, as in the challenge
+GRID_SIZE = 12
+# Pixels per cell and between cells
+CELL_SIZE = 40
+GAP_SIZE = 2
+IMAGE_SIZE = GRID_SIZE * CELL_SIZE + (GRID_SIZE + 1) * GAP_SIZE
+
+BACKGROUND = (255, 255, 255)
+NO_DATA = (0xEE, 0xEE, 0xEE)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Locks shared among players' images, so one player's redraw does not hold
+# up another's without keeping a lock per player
+RENDER_LOCK_STRIPES = 16
+
+
+class RenderedImage(NamedTuple):
+    """A rendered heatmap and the version of the data it was drawn from."""
+
+    version: Hashable
+    png: bytes
+    etag: str
+    # time.monotonic() when the version was last checked
+    checked: float
+
+
+def png_chunk(tag: bytes, data: bytes) -> bytes:
+    """Frame one PNG chunk with its length and CRC."""
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data))
+    )
+
+
+def encode_png(width: int, height: int, rows: Iterable[bytes]) -> bytes:
+    """
+    Encode 8-bit RGB pixels as a PNG.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        rows (Iterable[bytes]): height rows of width * 3 bytes, top to bottom
+
+    Returns:
+        bytes: The PNG file
+    """
+    # Every scanline starts with its filter type; 0 leaves it unfiltered
+    raw = b"".join(b"\x00" + row for row in rows)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(raw, 9))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def cell_colors(cells: Dict[str, Dict[str, Any]]) -> List[List[Tuple[int, int, int]]]:
+    """
+    Colour every cell of the grid the way getColor() does.
+
+    Args:
+        cells (Dict[str, Dict[str, Any]]): Heatmap cells keyed "a_b", each
+            with its avg_effective time
+
+    Returns:
+        List[List[Tuple[int, int, int]]]: RGB colour of each row's cells
+    """
+    averages = [cell["avg_effective"] for cell in cells.values()]
+    min_time = min(averages, default=0)
+    max_time = max(averages, default=1)
+
+    colors = []
+    for a in range(1, GRID_SIZE + 1):
+        row = []
+        for b in range(1, GRID_SIZE + 1):
+            cell = cells.get(f"{a}_{b}")
+            if cell is None:
+                row.append(NO_DATA)
+                continue
+            ratio = (cell["avg_effective"] - min_time) / (max_time - min_time + 0.0001)
+            # Math.round() rounds halves up, unlike round()
+            row.append((int(255 * ratio + 0.5), int(200 * (1 - ratio) + 0.5), 0))
+        colors.append(row)
+    return colors
+
+
+def render_heatmap(cells: Dict[str, Dict[str, Any]]) -> bytes:
+    """
+    Draw a heatmap as a PNG.
+
+    Args:
+        cells (Dict[str, Dict[str, Any]]): Heatmap cells keyed "a_b", as
+            /submit returns them
+
+    Returns:
+        bytes: IMAGE_SIZE by IMAGE_SIZE PNG of the grid
+    """
+    gap = bytes(BACKGROUND) * GAP_SIZE
+    gap_row = bytes(BACKGROUND) * IMAGE_SIZE
+
+    rows = [gap_row] * GAP_SIZE
+    for colors in cell_colors(cells):
+        # Every pixel row within a grid row is the same
+        row = gap + b"".join(bytes(color) * CELL_SIZE + gap for color in colors)
+        rows.extend([row] * CELL_SIZE)
+        rows.extend([gap_row] * GAP_SIZE)
+
+    return encode_png(IMAGE_SIZE, IMAGE_SIZE, rows)
+
+
+class HeatmapImageCache:
+    """
+    Bounded LRU cache of rendered heatmap images.
+
+    Entries are keyed by whose heatmap they show and tagged with the version
+    of the data they were drawn from. Callers only look the version up again
+    once an entry has been served for max_age seconds, so a burst of
+    preview fetches is answered from memory without touching the database.
+    """
+
+    def __init__(self, max_entries: int, max_age: float) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[Hashable, RenderedImage]" = OrderedDict()
+        # time.monotonic() when a key was last found to have nothing to draw
+        self._missing: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while checking and rendering, so an expired image is redrawn
+        # once rather than by every request that finds it expired. The world
+        # image (key None) has a lock of its own.
+        self._world_lock = threading.Lock()
+        self._render_locks = [threading.Lock() for _ in range(RENDER_LOCK_STRIPES)]
+
+    def render_lock(self, key: Hashable) -> threading.Lock:
+        """Return the lock to hold while checking and redrawing a key."""
+        if key is None:
+            return self._world_lock
+        return self._render_locks[hash(key) % len(self._render_locks)]
+
+    def get(self, key: Hashable) -> Optional[RenderedImage]:
+        """Return the cached image of a key, however old."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def fresh(self, key: Hashable) -> Optional[RenderedImage]:
+        """Return the cached image of a key if its version was checked recently."""
+        entry = self.get(key)
+        if entry is None or time.monotonic() - entry.checked >= self.max_age:
+            return None
+        return entry
+
+    def missing(self, key: Hashable) -> bool:
+        """Return whether a key was recently found to have nothing to draw."""
+        with self._lock:
+            checked = self._missing.get(key)
+            if checked is None:
+                return False
+            if time.monotonic() - checked >= self.max_age:
+                del self._missing[key]
+                return False
+            return True
+
+    def put_missing(self, key: Hashable) -> None:
+        """Remember for max_age seconds that a key has nothing to draw."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._missing[key] = time.monotonic()
+            self._missing.move_to_end(key)
+            while len(self._missing) > self.max_entries:
+                self._missing.popitem(last=False)
+
+    def put(self, key: Hashable, version: Hashable, png: bytes) -> RenderedImage:
+        """Store a new image as checked now, evicting the least recently used key."""
+        etag = hashlib.sha256(png).hexdigest()[:32]
+        return self._store(key, RenderedImage(version, png, etag, time.monotonic()))
+
+    def touch(self, key: Hashable, entry: RenderedImage) -> RenderedImage:
+        """Mark an image as checked now and still current."""
+        return self._store(key, entry._replace(checked=time.monotonic()))
+
+    def _store(self, key: Hashable, entry: RenderedImage) -> RenderedImage:
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._missing.pop(key, None)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
@@ -0,0 +1,99 @@
+"""
+Flask JSON provider that serializes with orjson when it is installed.
+
+Responses keep the default provider's contract: keys are sorted, output is
+compact outside debug mode, and values orjson does not handle natively
+(dates, decimals, UUIDs, dataclasses, Markup) go through Flask's default
+conversion. Anything orjson rejects, such as integers wider than 64 bits,
+falls back to the standard library.
+
+Both encoders write NaN and infinite floats as null. The standard library
+would otherwise write NaN and Infinity, which are not JSON and which the
+browser's JSON.parse() rejects. The output parses to the same values
+either way; check_json_encoding.py compares the two on real responses.
+The differences in the bytes are:
+
+- orjson sends non-ASCII text as UTF-8 rather than as \\u escapes.
+- orjson writes some floats in a different form, e.g. 1e16 rather
+  than 1e+16, with the same value.
+
+Set JSON_ENCODER=stdlib to use the standard library even when orjson is
+installed.
+"""
+
+import math
+import os
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used without it
+    orjson = None
+
+
+def finite(obj: Any) -> Any:
+    """Copy lists, tuples and dicts with NaN and infinite floats replaced by None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite(value) for value in obj]
+    return obj
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson and falls back to the stdlib."""
+
+    def __init__(self, app) -> None:
+        super().__init__(app)
+        self.use_orjson = (
+            orjson is not None and os.environ.get("JSON_ENCODER", "orjson") != "stdlib"
+        )
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """
+        Serialize data as UTF-8 encoded JSON.
+
+        Args:
+            obj (Any): Data to serialize
+            indent (bool): Indent by two spaces instead of writing compact JSON
+
+        Returns:
+            bytes: The encoded JSON
+        """
+        if self.use_orjson:
+            option = (
+                orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+            )
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except orjson.JSONEncodeError:
+                pass
+
+        kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+        try:
+            return super().dumps(obj, allow_nan=False, **kwargs).encode()
+        except ValueError:
+            # Write non-finite floats as null, as orjson does
+            return super().dumps(finite(obj), **kwargs).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs or not self.use_orjson:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype
+        )
@@ -0,0 +1,263 @@
+import sqlite3
+from typing import Callable, List
+
+
+def drop_default_preferences(cur: sqlite3.Cursor) -> None:
+    """Remove pizza_preferences rows that only record the default "indifferent"."""
+    cur.execute("DELETE FROM pizza_preferences WHERE preference = 1")
+
+
+def add_lookup_indexes(cur: sqlite3.Cursor) -> None:
+    """
+    Add the indexes used by the pizza party lookups.
+
+    The name indexes are not unique: older databases can hold duplicate
+    attendee names within a party and duplicate pizza names, and those rows
+    are left as they are. The routes check for an existing name before
+    inserting one.
+    """
+    for statement in (
+        """CREATE INDEX IF NOT EXISTS idx_pizza_attendees_party_name
+            ON pizza_attendees (party_number, name)""",
+        """CREATE INDEX IF NOT EXISTS idx_pizza_attendees_party_timestamp
+            ON pizza_attendees (party_number, timestamp)""",
+        """CREATE INDEX IF NOT EXISTS idx_pizza_preferences_attendee
+            ON pizza_preferences (attendee_id, ingredient, preference)""",
+        """CREATE INDEX IF NOT EXISTS idx_pizza_selections_attendee
+            ON pizza_selections (attendee_id, pizza_type, slice_count)""",
+        """CREATE INDEX IF NOT EXISTS idx_pizza_selections_type
+            ON pizza_selections (pizza_type, attendee_id)""",
+        """CREATE INDEX IF NOT EXISTS idx_named_pizzas_name
+            ON named_pizzas (name)""",
+        """CREATE INDEX IF NOT EXISTS idx_named_pizzas_ingredients_pizza
+            ON named_pizzas_ingredients (pizza_id, ingredient)""",
+    ):
+        cur.execute(statement)
+
+
+def add_named_pizza_search(cur: sqlite3.Cursor) -> None:
+    """
+    Add a trigram full-text index over named pizza names and ingredients.
+
+    Also narrows the ingredient index to pizza_id so GROUP_CONCAT lists a
+    pizza's ingredients in the order they were chosen again.
+    """
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS named_pizzas_search
+        USING fts5(name, ingredients, tokenize = 'trigram')
+    """
+    )
+    cur.execute(
+        """
+        INSERT INTO named_pizzas_search (rowid, name, ingredients)
+        SELECT np.id, np.name, COALESCE(GROUP_CONCAT(npi.ingredient, ' '), '')
+        FROM named_pizzas np
+        LEFT JOIN named_pizzas_ingredients npi ON np.id = npi.pizza_id
+        GROUP BY np.id, np.name
+    """
+    )
+
+    for statement in (
+        """CREATE TRIGGER IF NOT EXISTS trg_named_pizza_insert_search
+        AFTER INSERT ON named_pizzas
+        BEGIN
+            INSERT INTO named_pizzas_search (rowid, name, ingredients)
+              VALUES (NEW.id, NEW.name, '');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_named_pizza_delete_search
+        AFTER DELETE ON named_pizzas
+        BEGIN
+            DELETE FROM named_pizzas_search WHERE rowid = OLD.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_named_pizza_ingredient_insert_search
+        AFTER INSERT ON named_pizzas_ingredients
+        BEGIN
+            UPDATE named_pizzas_search
+              SET ingredients = ingredients || ' ' || NEW.ingredient
+              WHERE rowid = NEW.pizza_id;
+        END""",
+        "DROP INDEX IF EXISTS idx_named_pizzas_ingredients_pizza",
+        """CREATE INDEX IF NOT EXISTS idx_named_pizzas_ingredients_pizza_id
+            ON named_pizzas_ingredients (pizza_id)""",
+    ):
+        cur.execute(statement)
+
+
+def pizza_slug(name: str) -> str:
+    """Get the slug that selections use for a named pizza, after "custom_"."""
+    return name.lower().replace(" ", "_")
+
+
+def add_named_pizza_slugs(cur: sqlite3.Cursor) -> None:
+    """
+    Store each named pizza's slug and index it.
+
+    The slug is computed in Python rather than with SQLite's lower(), which
+    only folds ASCII letters and so would miss names like "Ñapolitana".
+    """
+    cur.execute("ALTER TABLE named_pizzas ADD COLUMN slug TEXT")
+    cur.execute("SELECT id, name FROM named_pizzas")
+    cur.executemany(
+        "UPDATE named_pizzas SET slug = ? WHERE id = ?",
+        [(pizza_slug(name), pizza_id) for pizza_id, name in cur.fetchall()],
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_named_pizzas_slug ON named_pizzas (slug)"
+    )
+
+
+def add_response_timestamp_index(cur: sqlite3.Cursor) -> None:
+    """Index responses by timestamp so retention finds old answers without a scan."""
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_responses_timestamp
+            ON responses (timestamp)
+    """
+    )
+
+
+def add_user_pair_aggregates(cur: sqlite3.Cursor) -> None:
+    """
+    Add per-user totals of each pair, for drawing one player's heatmap.
+
+    Like agg_pair and agg_user they are kept up by a trigger and outlive
+    the raw responses that retention deletes. Users' existing totals are
+    filled in from the responses that are still kept.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_user_pair (
+            user_id TEXT,
+            a INTEGER,
+            b INTEGER,
+            total_effective_time REAL,
+            count INTEGER,
+            wrong_count INTEGER,
+            PRIMARY KEY (user_id, a, b)
+        )
+    """
+    )
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO agg_user_pair
+            (user_id, a, b, total_effective_time, count, wrong_count)
+        SELECT user_id, a, b, SUM(effective_time), COUNT(*),
+               SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END)
+        FROM responses
+        GROUP BY user_id, a, b
+    """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_response_insert_agg_user_pair
+        AFTER INSERT ON responses
+        BEGIN
+            UPDATE agg_user_pair
+              SET total_effective_time = total_effective_time + NEW.effective_time,
+                  count = count + 1,
+                  wrong_count = wrong_count
+                    + (CASE WHEN NEW.correct = 0 THEN 1 ELSE 0 END)
+              WHERE user_id = NEW.user_id AND a = NEW.a AND b = NEW.b;
+
+            INSERT OR IGNORE INTO agg_user_pair
+                (user_id, a, b, total_effective_time, count, wrong_count)
+              VALUES (NEW.user_id, NEW.a, NEW.b, NEW.effective_time, 1,
+                      (CASE WHEN NEW.correct = 0 THEN 1 ELSE 0 END));
+        END
+    """
+    )
+
+
+def add_user_share_ids(cur: sqlite3.Cursor) -> None:
+    """
+    Give players a share id for links to their heatmap.
+
+    Share ids are random and filled in on a player's next submission, so
+    links never carry the user_id that /submit trusts as their identity.
+    """
+    cur.execute("ALTER TABLE agg_user ADD COLUMN share_id TEXT")
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_agg_user_share_id
+            ON agg_user (share_id)
+    """
+    )
+
+
+def add_party_versions(cur: sqlite3.Cursor) -> None:
+    """
+    Give every existing pizza party a summary version.
+
+    Parties joined before pizza_parties existed have no row, so their
+    version stayed 0 whatever changed and their cached summaries were never
+    dropped. The delete trigger is recreated so it adds a missing row too.
+    """
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO pizza_parties (party_number, version)
+        SELECT DISTINCT party_number, 1 FROM pizza_attendees
+    """
+    )
+    cur.execute("DROP TRIGGER IF EXISTS trg_pizza_attendee_delete_version")
+    cur.execute(
+        """
+        CREATE TRIGGER trg_pizza_attendee_delete_version
+        AFTER DELETE ON pizza_attendees
+        BEGIN
+            INSERT OR IGNORE INTO pizza_parties (party_number, version)
+              VALUES (OLD.party_number, 0);
+
+            UPDATE pizza_parties
+              SET version = version + 1
+              WHERE party_number = OLD.party_number;
+        END
+    """
+    )
+
+
+Migration = Callable[[sqlite3.Cursor], None]
+
+# Data migrations of each database in the order they were introduced. A
+# database's PRAGMA user_version records how many of its migrations have
+# been applied.
+TIMES_TABLES_MIGRATIONS: List[Migration] = [
+    add_response_timestamp_index,
+    add_user_pair_aggregates,
+    add_user_share_ids,
+]
+PIZZA_MIGRATIONS: List[Migration] = [
+    drop_default_preferences,
+    add_lookup_indexes,
+    add_named_pizza_search,
+    add_named_pizza_slugs,
+    add_party_versions,
+]
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration]) -> None:
+    """
+    Apply any migrations the database has not seen yet.
+
+    Every gunicorn worker calls this on startup, so the write lock is taken
+    before user_version is read to make sure each migration runs only once.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database
+        migrations (List[Migration]): All migrations of that database, in order
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+
+    try:
+        cur.execute("PRAGMA user_version")
+        applied = cur.fetchone()[0]
+
+        for version, migration in enumerate(migrations[applied:], start=applied + 1):
+            migration(cur)
+            cur.execute(f"PRAGMA user_version = {version}")
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
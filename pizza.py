@@ -0,0 +1,1534 @@
+"""
+The slicetomeetyou.com pizza party app.
+
+Attendees join a party with their slice count and ingredient preferences,
+and the party summary works out which pizzas to order. The pizza database
+is set up and ingredients.json is loaded when the blueprint serves its
+first request, so workers that never see a pizza request skip both.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from flask import Blueprint, jsonify, request
+
+from assets import asset_url
+from migrations import pizza_slug
+from precomputed import PrecomputedResponse
+from snapshots import connect_snapshot
+from startup_profile import profiled
+from storage import PIZZA, connect, init_database
+from structured_logging import get_logger
+
+blueprint = Blueprint("pizza", __name__)
+log = get_logger(__name__)
+
+# Maximum number of serialized party summaries kept per worker
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", "256"))
+# Seconds a worker serves its copy of /pizza/available before checking for
+# pizzas created by other workers
+AVAILABLE_PIZZAS_MAX_AGE = float(os.environ.get("AVAILABLE_PIZZAS_MAX_AGE", "5"))
+# Custom pizzas returned per /pizza/available page, and the most a client may ask for
+AVAILABLE_PIZZAS_PAGE_SIZE = 20
+AVAILABLE_PIZZAS_MAX_PAGE_SIZE = 100
+# Larger than any rowid, so the first page uses the same range search as the rest
+MAX_ROWID = 2**63 - 1
+# Most parties one /pizza/summaries request may ask for
+MAX_BATCH_PARTIES = 100
+INGREDIENTS_FILE = "ingredients.json"
+
+
+def load_ingredients() -> Dict[str, Any]:
+    """Load ingredients data from JSON file."""
+    try:
+        with open(INGREDIENTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # Fallback if file doesn't exist
+        return {"all_ingredients": [], "categories": {}, "icons": {}}
+
+
+def ingredients_mtime() -> Optional[int]:
+    """Get the modification time of the ingredients file, if it exists."""
+    try:
+        return os.stat(INGREDIENTS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+# Ingredients data, loaded on the first pizza request and reloaded whenever
+# ingredients.json changes
+INGREDIENTS_MTIME: Optional[int] = None
+INGREDIENTS_DATA: Dict[str, Any] = {
+    "all_ingredients": [],
+    "categories": {},
+    "icons": {},
+}
+PIZZA_INGREDIENTS: List[str] = []
+INGREDIENT_POSITIONS: Dict[str, int] = {}
+# Serialized on first use after each load
+INGREDIENTS_RESPONSE: Optional[PrecomputedResponse] = None
+
+
+# Base-3 digits of packed preferences: indifferent (1) is 0 so it can be skipped
+PREFERENCE_DIGITS: Dict[int, int] = {1: 0, 2: 1, 0: 2}
+DIGIT_PREFERENCES: Dict[int, int] = {
+    digit: preference for preference, digit in PREFERENCE_DIGITS.items()
+}
+PreferenceKey = Tuple[int, Tuple[Tuple[str, int], ...]]
+
+# Pizzas everyone can pick from, alongside the custom ones in named_pizzas
+HARDCODED_PIZZAS: List[Dict[str, Any]] = [
+    {
+        "id": "pepperoni",
+        "name": "Pepperoni",
+        "ingredients": ["pepperoni"],
+        "type": "hardcoded",
+    },
+    {"id": "cheese", "name": "Cheese", "ingredients": [], "type": "hardcoded"},
+    {
+        "id": "pineapple-ham",
+        "name": "Pineapple and Ham",
+        "ingredients": ["pineapple", "ham"],
+        "type": "hardcoded",
+    },
+    {
+        "id": "spinach-tomato-pineapple",
+        "name": "Spinach, Tomatoes and Pineapple",
+        "ingredients": ["spinach", "tomatoes", "pineapple"],
+        "type": "hardcoded",
+    },
+]
+
+# Attendee overrides for special cases
+ATTENDEE_OVERRIDES: List[Dict[str, Any]] = [
+    {
+        "names": [
+            "Stephen",
+            "Andrew",
+            "Alex",
+            "Vanessa",
+            "Brynn",
+            "Dominic",
+            "Benjamin",
+            "Bridget",
+            "Holly",
+        ],
+        "trigger_name": "Evelyn",
+        "override_image": "auntielynn.jpg",
+        "override_message": "Auntie Lynn says hi! 🍕",
+    }
+]
+
+
+class SummaryCache:
+    """
+    Bounded LRU cache of serialized pizza party summaries.
+
+    Entries are keyed by party number and tagged with the party's version
+    from the pizza_parties table. Writers bump that version in SQLite, so
+    every gunicorn worker sees the invalidation on its next lookup.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, PrecomputedResponse]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, party_number: str, version: int) -> Optional["PrecomputedResponse"]:
+        """Return the cached summary if it matches the party's version."""
+        with self._lock:
+            entry = self._entries.get(party_number)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(party_number)
+            return entry[1]
+
+    def clear(self) -> None:
+        """Drop every cached summary."""
+        with self._lock:
+            self._entries.clear()
+
+    def put(
+        self, party_number: str, version: int, summary: "PrecomputedResponse"
+    ) -> None:
+        """Store a summary, evicting the least recently used party."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[party_number] = (version, summary)
+            self._entries.move_to_end(party_number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+SUMMARY_CACHE = SummaryCache(SUMMARY_CACHE_SIZE)
+
+# First page of /pizza/available as of the newest named pizza id, and when it
+# was last checked
+AVAILABLE_PIZZAS_RESPONSE: Optional[PrecomputedResponse] = None
+AVAILABLE_PIZZAS_VERSION: Optional[int] = None
+AVAILABLE_PIZZAS_CHECKED = 0.0
+
+
+INITIALIZED = False
+INITIALIZE_LOCK = threading.Lock()
+
+
+def refresh_ingredients() -> None:
+    """Load ingredients.json and everything derived from it."""
+    global INGREDIENTS_MTIME, INGREDIENTS_DATA, PIZZA_INGREDIENTS, INGREDIENT_POSITIONS
+    global INGREDIENTS_RESPONSE
+
+    INGREDIENTS_MTIME = ingredients_mtime()
+    INGREDIENTS_DATA = load_ingredients()
+    PIZZA_INGREDIENTS = INGREDIENTS_DATA.get("all_ingredients", [])
+    INGREDIENT_POSITIONS = {
+        ingredient: position for position, ingredient in enumerate(PIZZA_INGREDIENTS)
+    }
+    INGREDIENTS_RESPONSE = None
+
+    # Summaries fill in default preferences for every ingredient on the menu
+    SUMMARY_CACHE.clear()
+
+
+def initialize() -> None:
+    """Set up the pizza database and load the ingredients, once per worker."""
+    global INITIALIZED
+    if INITIALIZED:
+        return
+
+    with INITIALIZE_LOCK:
+        if INITIALIZED:
+            return
+        with profiled("init pizza"):
+            init_database(PIZZA)
+            refresh_ingredients()
+        INITIALIZED = True
+
+
+@blueprint.before_request
+def initialize_or_reload_ingredients() -> None:
+    """Initialize on the first request, and reload ingredients.json if it changed."""
+    initialize()
+    if ingredients_mtime() != INGREDIENTS_MTIME:
+        refresh_ingredients()
+
+
+@blueprint.route("/pizza/join", methods=["POST"])
+def join_pizza_party() -> Dict[str, Any]:
+    """
+    Join a pizza party with attendee preferences.
+
+    Returns:
+        Dict[str, Any]: JSON response with success status and optional override info
+    """
+    data = request.get_json()
+    party_id = data.get("partyNumber")
+    name = data.get("name")
+    custom_pizza = data.get("custom_pizza", {})
+    existing_pizza_slices = data.get("existingPizza_slicesWanted", {})
+
+    # Calculate total slice count from custom pizza and existing pizza selections
+    custom_slices = custom_pizza.get("sliceCount", 0)
+    existing_slices = (
+        sum(existing_pizza_slices.values()) if existing_pizza_slices else 0
+    )
+    total_slice_count = custom_slices + existing_slices
+
+    # Get preferences from custom pizza
+    preferences = custom_pizza.get("preferences", {})
+
+    if not all([party_id, name]) or total_slice_count <= 0:
+        return (
+            jsonify(
+                {
+                    "error": "Party ID, name, and at least one slice selection are required"
+                }
+            ),
+            400,
+        )
+
+    # Validate party ID format (4 characters, letters and numbers)
+    if not party_id or len(party_id) != 4 or not party_id.isalnum():
+        return (
+            jsonify(
+                {"error": "Party ID must be exactly 4 characters (letters and numbers)"}
+            ),
+            400,
+        )
+
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        # Check if someone with this name has already joined this party
+        cur.execute(
+            """
+            SELECT id FROM pizza_attendees 
+            WHERE party_number = ? AND name = ?
+        """,
+            (party_id.upper(), name),
+        )
+
+        if cur.fetchone():
+            return (
+                jsonify(
+                    {
+                        "error": f"Someone with the name '{name}' has already joined this party. Please use a different name or ask the party organizer for help."
+                    }
+                ),
+                400,
+            )
+
+        # Check for attendee overrides
+        override_info = None
+        log.debug("Checking attendee overrides", name=name)
+        for override in ATTENDEE_OVERRIDES:
+            if name in override["names"]:
+                log.debug("Found attendee override", name=name)
+                # Check if the Boss of this attendee e.g. Evelyn is already in this party
+                cur.execute(
+                    """
+                    SELECT id FROM pizza_attendees 
+                    WHERE party_number = ? AND name = ?
+                """,
+                    (party_id.upper(), override["trigger_name"]),
+                )
+
+                boss = cur.fetchone()
+                log.debug(
+                    "Looked up override trigger attendee",
+                    trigger_name=override["trigger_name"],
+                    trigger_attendee_id=boss[0] if boss else None,
+                )
+                if boss:
+                    override_info = override
+                    # Get the Boss's preferences
+                    cur.execute(
+                        """
+                        SELECT ingredient, preference FROM pizza_preferences 
+                        WHERE attendee_id = ?
+                    """,
+                        (boss[0],),
+                    )
+                    evelyn_preferences = dict(cur.fetchall())
+                    # Override the current preferences with the Boss's preferences
+                    preferences = evelyn_preferences
+                    log.debug(
+                        "Preference override triggered",
+                        name=name,
+                        trigger_name=override["trigger_name"],
+                        preferences=lambda: dict(evelyn_preferences),
+                    )
+                    break
+
+        # Insert attendee
+        cur.execute(
+            """
+            INSERT INTO pizza_attendees (party_number, name, slice_count)
+            VALUES (?, ?, ?)
+        """,
+            (party_id.upper(), name, total_slice_count),
+        )
+
+        attendee_id = cur.lastrowid
+
+        # Insert preferences, skipping the default "indifferent" (1) which
+        # readers reconstruct with expand_preferences()
+        cur.executemany(
+            """
+            INSERT INTO pizza_preferences (attendee_id, ingredient, preference)
+            VALUES (?, ?, ?)
+        """,
+            [
+                (attendee_id, ingredient, preferences[ingredient])
+                for ingredient in PIZZA_INGREDIENTS
+                if preferences.get(ingredient, 1) != 1
+            ],
+        )
+
+        # Insert existing pizza selections
+        for pizza_type, slice_count in existing_pizza_slices.items():
+            if slice_count > 0:
+                cur.execute(
+                    """
+                    INSERT INTO pizza_selections (attendee_id, pizza_type, slice_count)
+                    VALUES (?, ?, ?)
+                """,
+                    (attendee_id, pizza_type, slice_count),
+                )
+
+        conn.commit()
+        conn.close()
+
+        response_data = {
+            "success": True,
+            "message": "Successfully joined the pizza party!",
+        }
+
+        # Add override info if applicable
+        if override_info:
+            response_data["override"] = {
+                "image": asset_url(override_info["override_image"]),
+                "message": override_info["override_message"],
+            }
+
+        return jsonify(response_data)
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+
+@blueprint.route("/pizza/ingredients", methods=["GET"])
+def get_pizza_ingredients() -> Dict[str, Any]:
+    """
+    Get all available pizza ingredients with categories and icons.
+
+    Returns:
+        Dict[str, Any]: JSON response with complete ingredients data
+    """
+    global INGREDIENTS_RESPONSE
+    if INGREDIENTS_RESPONSE is None:
+        INGREDIENTS_RESPONSE = PrecomputedResponse(INGREDIENTS_DATA)
+    return INGREDIENTS_RESPONSE.to_response()
+
+
+@blueprint.route("/pizza/available", methods=["GET"])
+def get_available_pizzas() -> Dict[str, Any]:
+    """
+    Get available pizzas (hardcoded + custom created ones), one page at a time.
+
+    Query parameters:
+        cursor: next_cursor from the previous page
+        limit: custom pizzas per page (default 20, at most 100)
+        q: text of at least 3 characters to find in pizza names or ingredients
+        exclude: comma-separated ingredients the attendee will not eat
+
+    The first page without parameters is precomputed and only rebuilt when a
+    pizza has been created since this worker last built it.
+
+    Returns:
+        Dict[str, Any]: JSON response with hardcoded and custom pizzas, and
+                       the cursor of the next page (null on the last page)
+    """
+    global AVAILABLE_PIZZAS_CHECKED
+
+    if not request.args:
+        if (
+            AVAILABLE_PIZZAS_RESPONSE is not None
+            and time.monotonic() - AVAILABLE_PIZZAS_CHECKED < AVAILABLE_PIZZAS_MAX_AGE
+        ):
+            return AVAILABLE_PIZZAS_RESPONSE.to_response()
+
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", AVAILABLE_PIZZAS_PAGE_SIZE, type=int)
+    search = request.args.get("q", "").strip()
+    exclude = [
+        ingredient
+        for ingredient in request.args.get("exclude", "").split(",")
+        if ingredient
+    ]
+
+    if not 1 <= limit <= AVAILABLE_PIZZAS_MAX_PAGE_SIZE:
+        return (
+            jsonify(
+                {
+                    "error": "Limit must be between 1 and "
+                    f"{AVAILABLE_PIZZAS_MAX_PAGE_SIZE}"
+                }
+            ),
+            400,
+        )
+
+    if search and len(search) < 3:
+        return jsonify({"error": "Search text must be at least 3 characters"}), 400
+
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        if request.args:
+            page = fetch_available_pizzas(cur, cursor, limit, search, exclude)
+            conn.close()
+            return jsonify(page)
+
+        cur.execute("SELECT MAX(id) FROM named_pizzas")
+        version = cur.fetchone()[0]
+
+        if AVAILABLE_PIZZAS_RESPONSE is None or version != AVAILABLE_PIZZAS_VERSION:
+            build_available_pizzas(cur, version)
+        AVAILABLE_PIZZAS_CHECKED = time.monotonic()
+
+        conn.close()
+
+        return AVAILABLE_PIZZAS_RESPONSE.to_response()
+
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+
+def fetch_available_pizzas(
+    cur,
+    cursor: Optional[int] = None,
+    limit: int = AVAILABLE_PIZZAS_PAGE_SIZE,
+    search: str = "",
+    exclude: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one page of available pizzas, newest custom pizzas first.
+
+    Custom pizzas are paged by id so every page is a range search on the
+    primary key; searches go through the named_pizzas_search trigram index.
+
+    Args:
+        cur: Database cursor
+        cursor (Optional[int]): Only return custom pizzas with a smaller id
+        limit (int): Maximum number of custom pizzas to return
+        search (str): Text to find in pizza names or ingredients
+        exclude (Optional[List[str]]): Ingredients the pizzas must not contain
+
+    Returns:
+        Dict[str, Any]: Page with hardcoded_pizzas (first page only),
+            custom_pizzas, all_pizzas and next_cursor
+    """
+    excluded = set(exclude or [])
+
+    if search:
+        source = """named_pizzas_search
+            JOIN named_pizzas np ON np.id = named_pizzas_search.rowid"""
+        key = "named_pizzas_search.rowid"
+    else:
+        source = "named_pizzas np"
+        key = "np.id"
+
+    conditions = [f"{key} < ?"]
+    params: List[Any] = [cursor if cursor is not None else MAX_ROWID]
+
+    if search:
+        conditions.append("named_pizzas_search MATCH ?")
+        params.append('"' + search.replace('"', '""') + '"')
+
+    if excluded:
+        placeholders = ",".join(["?" for _ in excluded])
+        conditions.append(
+            f"""NOT EXISTS (
+                SELECT 1 FROM named_pizzas_ingredients x
+                WHERE x.pizza_id = np.id AND x.ingredient IN ({placeholders})
+            )"""
+        )
+        params.extend(excluded)
+
+    # Fetch one extra pizza to find out whether there is another page
+    params.append(limit + 1)
+
+    cur.execute(
+        f"""
+        SELECT p.id, p.name, GROUP_CONCAT(npi.ingredient, ',') as ingredients
+        FROM (
+            SELECT np.id, np.name
+            FROM {source}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {key} DESC
+            LIMIT ?
+        ) p
+        LEFT JOIN named_pizzas_ingredients npi ON p.id = npi.pizza_id
+        GROUP BY p.id, p.name
+        ORDER BY p.id DESC
+    """,
+        params,
+    )
+
+    custom_pizzas_data = cur.fetchall()
+    custom_pizzas = []
+
+    for pizza_id, name, ingredients_str in custom_pizzas_data[:limit]:
+        ingredients = ingredients_str.split(",") if ingredients_str else []
+        custom_pizzas.append(
+            {
+                "id": f"custom_{pizza_id}",
+                "name": name,
+                "ingredients": ingredients,
+                "type": "custom",
+            }
+        )
+
+    next_cursor = None
+    if len(custom_pizzas_data) > limit:
+        next_cursor = custom_pizzas_data[limit - 1][0]
+
+    # Hardcoded pizzas only come with the first page
+    hardcoded_pizzas = []
+    if cursor is None:
+        hardcoded_pizzas = [
+            pizza
+            for pizza in HARDCODED_PIZZAS
+            if not excluded.intersection(pizza["ingredients"])
+            and search.lower()
+            in " ".join([pizza["name"]] + pizza["ingredients"]).lower()
+        ]
+
+    return {
+        "hardcoded_pizzas": hardcoded_pizzas,
+        "custom_pizzas": custom_pizzas,
+        "all_pizzas": hardcoded_pizzas + custom_pizzas,
+        "next_cursor": next_cursor,
+    }
+
+
+def build_available_pizzas(cur, version: Optional[int]) -> None:
+    """
+    Rebuild the precomputed first page of /pizza/available.
+
+    Args:
+        cur: Database cursor
+        version (Optional[int]): Newest named pizza id the response includes
+    """
+    global AVAILABLE_PIZZAS_RESPONSE, AVAILABLE_PIZZAS_VERSION
+
+    AVAILABLE_PIZZAS_RESPONSE = PrecomputedResponse(fetch_available_pizzas(cur))
+    AVAILABLE_PIZZAS_VERSION = version
+
+
+@blueprint.route("/pizza/create", methods=["POST"])
+def create_pizza() -> Dict[str, Any]:
+    """
+    Create a named pizza for all parties.
+
+    Returns:
+        Dict[str, Any]: JSON response with success status
+    """
+    data = request.get_json()
+    pizza_name = data.get("pizzaName")
+    ingredients = data.get("ingredients", [])
+
+    if not pizza_name:
+        return jsonify({"error": "Pizza name is required"}), 400
+
+    if not ingredients:
+        return jsonify({"error": "At least one ingredient is required"}), 400
+
+    if len(ingredients) > 3:
+        return jsonify({"error": "Maximum of 3 ingredients allowed"}), 400
+
+    # Validate ingredients against available list
+    valid_ingredients = set(PIZZA_INGREDIENTS)
+    for ingredient in ingredients:
+        if ingredient not in valid_ingredients:
+            return jsonify({"error": f"Invalid ingredient: {ingredient}"}), 400
+
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        # Check if pizza name already exists
+        cur.execute("SELECT id FROM named_pizzas WHERE name = ?", (pizza_name,))
+        if cur.fetchone():
+            return (
+                jsonify({"error": f"Pizza with name '{pizza_name}' already exists"}),
+                400,
+            )
+
+        # Insert the named pizza
+        cur.execute(
+            "INSERT INTO named_pizzas (name, slug) VALUES (?, ?)",
+            (pizza_name, pizza_slug(pizza_name)),
+        )
+        pizza_id = cur.lastrowid
+
+        # Insert the ingredients
+        for ingredient in ingredients:
+            cur.execute(
+                "INSERT INTO named_pizzas_ingredients (pizza_id, ingredient) VALUES (?, ?)",
+                (pizza_id, ingredient),
+            )
+
+        # Invalidate cached summaries of parties that already selected this pizza
+        cur.execute(
+            """
+            UPDATE pizza_parties SET version = version + 1
+            WHERE party_number IN (
+                SELECT pa.party_number
+                FROM pizza_selections ps
+                JOIN pizza_attendees pa ON ps.attendee_id = pa.id
+                WHERE ps.pizza_type IN (?, ?)
+            )
+        """,
+            (f"custom_{pizza_id}", f"custom_{pizza_slug(pizza_name)}"),
+        )
+
+        conn.commit()
+
+        # Serve the new pizza from this worker's /pizza/available right away
+        build_available_pizzas(cur, pizza_id)
+        conn.close()
+
+        return jsonify(
+            {
+                "success": True,
+                "message": f"Pizza '{pizza_name}' created successfully!",
+                "pizza_id": pizza_id,
+            }
+        )
+
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+
+@blueprint.route("/pizza/summary/<party_id>", methods=["GET"])
+def get_pizza_party_summary(party_id: str) -> Dict[str, Any]:
+    """
+    Get pizza party summary with attendee data and calculated pizza orders.
+
+    Summaries are served from SUMMARY_CACHE while the party's version in
+    pizza_parties is unchanged, so repeat refreshes cost a single lookup,
+    and the cached entry keeps its encoded and compressed bytes.
+
+    Args:
+        party_id (str): 4-character alphanumeric party identifier
+
+    Returns:
+        Dict[str, Any]: JSON response with party summary, attendee list,
+                       total slices, top ingredients, and pizza orders
+    """
+    # Validate party ID format
+    if not party_id or len(party_id) != 4 or not party_id.isalnum():
+        return jsonify({"error": "Invalid party ID format"}), 400
+
+    party_number = party_id.upper()
+
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        version = get_party_version(cur, party_number)
+        cached = SUMMARY_CACHE.get(party_number, version)
+
+        if cached is None:
+            summary = build_pizza_party_summary(party_number, cur)
+            if summary is None:
+                conn.close()
+                return jsonify({"error": "No party found with that ID"}), 404
+
+            cached = PrecomputedResponse(summary)
+            SUMMARY_CACHE.put(party_number, version, cached)
+
+        conn.close()
+
+        return cached.to_response()
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+
+@blueprint.route("/pizza/summaries", methods=["POST"])
+def get_pizza_party_summaries() -> Dict[str, Any]:
+    """
+    Get the summaries of several pizza parties at once.
+
+    Attendees, preferences and selections for all requested parties are
+    fetched in a handful of set-based queries rather than one summary
+    pipeline per party. They are read from the database snapshot, so they
+    may be up to SNAPSHOT_MAX_AGE seconds behind /pizza/summary/<party_id>,
+    which always reads the live database.
+
+    Request JSON:
+        party_ids (List[str]): 4-character alphanumeric party identifiers
+        combined (bool): Also summarize all the parties as one order
+
+    Returns:
+        Dict[str, Any]: JSON response with a summary per party found, the
+                       party ids with no attendees, and the optional
+                       combined summary
+    """
+    data = request.get_json()
+    party_ids = data.get("party_ids", [])
+    combined = data.get("combined", False)
+
+    if not isinstance(party_ids, list) or not party_ids:
+        return jsonify({"error": "At least one party ID is required"}), 400
+
+    if len(party_ids) > MAX_BATCH_PARTIES:
+        return (
+            jsonify({"error": f"At most {MAX_BATCH_PARTIES} parties per request"}),
+            400,
+        )
+
+    for party_id in party_ids:
+        if (
+            not isinstance(party_id, str)
+            or len(party_id) != 4
+            or not party_id.isalnum()
+        ):
+            return jsonify({"error": f"Invalid party ID format: {party_id}"}), 400
+
+    # Keep the requested order but summarize each party once
+    party_numbers = list(dict.fromkeys(party_id.upper() for party_id in party_ids))
+
+    conn = connect_snapshot(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        parties = load_parties(cur, party_numbers)
+        custom_pizzas = load_custom_pizzas(
+            cur,
+            {
+                pizza_type
+                for party in parties.values()
+                for _, pizza_type, _ in party["selections"]
+            },
+        )
+
+        conn.close()
+
+        # Parties that exist, in the requested order
+        found = [
+            party_number for party_number in party_numbers if party_number in parties
+        ]
+
+        response_data: Dict[str, Any] = {
+            "summaries": {
+                party_number: summarize_party(
+                    party_number, parties[party_number], custom_pizzas
+                )
+                for party_number in found
+            },
+            "missing": [
+                party_number
+                for party_number in party_numbers
+                if party_number not in parties
+            ],
+        }
+
+        if combined and found:
+            response_data["combined"] = summarize_party(
+                "+".join(found),
+                {
+                    **{
+                        key: [
+                            row
+                            for party_number in found
+                            for row in parties[party_number][key]
+                        ]
+                        for key in ("attendees", "preferences_data", "selections")
+                    },
+                    "preference_keys": {
+                        attendee_id: key
+                        for party_number in found
+                        for attendee_id, key in parties[party_number][
+                            "preference_keys"
+                        ].items()
+                    },
+                },
+                custom_pizzas,
+            )
+
+        return jsonify(response_data)
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+
+def get_party_version(cur, party_number: str) -> int:
+    """
+    Get the current summary version of a party.
+
+    Args:
+        party_number (str): Upper-cased party identifier
+        cur: Database cursor
+
+    Returns:
+        int: Version from pizza_parties, or 0 if the party has no row yet
+    """
+    cur.execute(
+        "SELECT version FROM pizza_parties WHERE party_number = ?", (party_number,)
+    )
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def build_pizza_party_summary(party_number: str, cur) -> Optional[Dict[str, Any]]:
+    """
+    Build the summary for a pizza party from the database.
+
+    Args:
+        party_number (str): Upper-cased party identifier
+        cur: Database cursor
+
+    Returns:
+        Optional[Dict[str, Any]]: Summary dictionary, or None if the party
+            has no attendees
+    """
+    parties = load_parties(cur, [party_number])
+    if party_number not in parties:
+        return None
+
+    party = parties[party_number]
+    custom_pizzas = load_custom_pizzas(
+        cur, {pizza_type for _, pizza_type, _ in party["selections"]}
+    )
+
+    return summarize_party(party_number, party, custom_pizzas)
+
+
+def load_parties(cur, party_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch the attendees, preferences and selections of several parties.
+
+    Args:
+        cur: Database cursor
+        party_numbers (List[str]): Upper-cased party identifiers
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Data of every party with attendees, keyed
+            by party number, each containing:
+            - "attendees" (List[Tuple[int, str, int]]): (attendee_id, name,
+              slice_count) in joining order
+            - "preferences_data" (List[Tuple[int, str, int]]): Dense
+              (attendee_id, ingredient, preference) rows
+            - "selections" (List[Tuple[int, str, int]]): (attendee_id,
+              pizza_type, slice_count) rows
+            - "preference_keys" (Dict[int, PreferenceKey]): Packed
+              preferences of each attendee, see encode_preferences()
+    """
+    placeholders = ",".join(["?" for _ in party_numbers])
+
+    cur.execute(
+        f"""
+        SELECT id, party_number, name, slice_count
+        FROM pizza_attendees
+        WHERE party_number IN ({placeholders})
+        ORDER BY party_number, timestamp
+    """,
+        party_numbers,
+    )
+
+    parties: Dict[str, Dict[str, Any]] = {}
+    attendee_parties: Dict[int, str] = {}
+    for attendee_id, party_number, name, slice_count in cur.fetchall():
+        if party_number not in parties:
+            parties[party_number] = {"attendees": [], "selections": []}
+        parties[party_number]["attendees"].append((attendee_id, name, slice_count))
+        attendee_parties[attendee_id] = party_number
+
+    cur.execute(
+        f"""
+        SELECT pp.attendee_id, pp.ingredient, pp.preference
+        FROM pizza_attendees pa
+        JOIN pizza_preferences pp ON pp.attendee_id = pa.id
+        WHERE pa.party_number IN ({placeholders})
+    """,
+        party_numbers,
+    )
+
+    sparse_preferences: Dict[str, List[Tuple[int, str, int]]] = {}
+    attendee_preferences: Dict[int, Dict[str, int]] = {}
+    for row in cur.fetchall():
+        sparse_preferences.setdefault(attendee_parties[row[0]], []).append(row)
+        attendee_preferences.setdefault(row[0], {})[row[1]] = row[2]
+
+    for party_number, party in parties.items():
+        attendee_ids = [attendee[0] for attendee in party["attendees"]]
+        party["preferences_data"] = expand_preferences(
+            attendee_ids, sparse_preferences.get(party_number, [])
+        )
+        party["preference_keys"] = {
+            attendee_id: encode_preferences(attendee_preferences.get(attendee_id, {}))
+            for attendee_id in attendee_ids
+        }
+
+    cur.execute(
+        f"""
+        SELECT ps.attendee_id, ps.pizza_type, ps.slice_count
+        FROM pizza_attendees pa
+        JOIN pizza_selections ps ON ps.attendee_id = pa.id
+        WHERE pa.party_number IN ({placeholders})
+    """,
+        party_numbers,
+    )
+
+    for row in cur.fetchall():
+        parties[attendee_parties[row[0]]]["selections"].append(row)
+
+    return parties
+
+
+def load_custom_pizzas(cur, pizza_types: Set[str]) -> List[Tuple[str, str, List[str]]]:
+    """
+    Fetch the named pizzas that attendees selected, newest first.
+
+    Selections refer to a named pizza as "custom_" followed by its slug: its
+    name in lower case with spaces replaced by underscores, as stored in
+    named_pizzas.slug.
+
+    Args:
+        cur: Database cursor
+        pizza_types (Set[str]): Pizza types found in pizza_selections
+
+    Returns:
+        List[Tuple[str, str, List[str]]]: (pizza_type, name, ingredients)
+            for every named pizza matching one of the pizza types
+    """
+    slugs = [
+        pizza_type[len("custom_") :]
+        for pizza_type in pizza_types
+        if pizza_type.startswith("custom_")
+    ]
+    if not slugs:
+        return []
+
+    placeholders = ",".join(["?" for _ in slugs])
+    cur.execute(
+        f"""
+        SELECT np.name, np.slug, GROUP_CONCAT(npi.ingredient, ',') as ingredients
+        FROM named_pizzas np
+        LEFT JOIN named_pizzas_ingredients npi ON np.id = npi.pizza_id
+        WHERE np.slug IN ({placeholders})
+        GROUP BY np.id, np.name
+        ORDER BY np.timestamp DESC
+    """,
+        slugs,
+    )
+
+    custom_pizzas = []
+    for pizza_name, slug, ingredients_str in cur.fetchall():
+        ingredients = ingredients_str.split(",") if ingredients_str else []
+        custom_pizzas.append((f"custom_{slug}", pizza_name, ingredients))
+
+    return custom_pizzas
+
+
+def summarize_party(
+    party_number: str,
+    party: Dict[str, Any],
+    custom_pizzas: List[Tuple[str, str, List[str]]],
+) -> Dict[str, Any]:
+    """
+    Summarize a pizza party from its loaded data.
+
+    Args:
+        party_number (str): Party identifier to report
+        party (Dict[str, Any]): Party data as returned by load_parties()
+        custom_pizzas (List[Tuple[str, str, List[str]]]): Named pizzas as
+            returned by load_custom_pizzas()
+
+    Returns:
+        Dict[str, Any]: Party summary with attendee list, total slices, top
+            ingredients, pizza orders and preference collections
+    """
+    attendees = party["attendees"]
+    preferences_data = party["preferences_data"]
+
+    # Calculate totals
+    total_slices = sum(attendee[2] for attendee in attendees)
+    names = [attendee[1] for attendee in attendees]
+
+    # Create preference collections (group attendees with same preferences)
+    preference_keys = party["preference_keys"]
+    preference_collections = {}
+    for attendee_id, name, slice_count in attendees:
+        key = preference_keys[attendee_id]
+
+        if key not in preference_collections:
+            preference_collections[key] = {"total_slices": 0, "attendees": []}
+
+        preference_collections[key]["total_slices"] += slice_count
+        preference_collections[key]["attendees"].append(name)
+
+    # Sort collections by total slices descending
+    sorted_collections = sorted(
+        preference_collections.items(),
+        key=lambda x: x[1]["total_slices"],
+        reverse=True,
+    )
+
+    # Format preference collections for display
+    formatted_collections = []
+    for key, collection_data in sorted_collections:
+        wants = []
+        cant_haves = []
+
+        for ingredient, preference in sorted(decode_preferences(key).items()):
+            if preference == 2:  # Want
+                wants.append(ingredient)
+            elif preference == 0:  # Can't have
+                cant_haves.append(ingredient)
+
+        # Create description
+        description_parts = []
+        if wants:
+            description_parts.append(f"WANT {', '.join(wants)}")
+        if cant_haves:
+            description_parts.append(f"CAN'T HAVE {', '.join(cant_haves)}")
+        if not wants and not cant_haves:
+            description_parts.append("indifferent to all")
+
+        description = ", ".join(description_parts)
+
+        formatted_collections.append(
+            {
+                "slices": collection_data["total_slices"],
+                "description": description,
+                "attendees": collection_data["attendees"],
+            }
+        )
+
+    # Organize preferences by ingredient (for pizza calculation)
+    ingredient_scores = {}
+    for attendee_id, ingredient, preference in preferences_data:
+        if ingredient not in ingredient_scores:
+            ingredient_scores[ingredient] = []
+        ingredient_scores[ingredient].append(preference)
+
+    # Calculate optimal pizza orders with attendee assignments
+    ai_generated_orders = calculate_pizza_orders(
+        attendees, ingredient_scores, preferences_data
+    )
+
+    # Calculate comprehensive pizza orders including existing selections
+    comprehensive_pizza_orders = calculate_comprehensive_pizza_orders(
+        attendees, preferences_data, party["selections"], custom_pizzas
+    )
+
+    # Get top 3 most wanted ingredients
+    top_ingredients = []
+    for ingredient in PIZZA_INGREDIENTS:
+        if ingredient in ingredient_scores:
+            want_count = sum(1 for pref in ingredient_scores[ingredient] if pref == 2)
+            if want_count > 0:
+                top_ingredients.append((ingredient, want_count))
+
+    top_ingredients.sort(key=lambda x: x[1], reverse=True)
+    top_3_ingredients = top_ingredients[:3]
+
+    return {
+        "party_number": party_number,
+        "attendees": names,
+        "total_slices": total_slices,
+        "top_ingredients": top_3_ingredients,
+        "pizza_orders": ai_generated_orders,  # Keep the AI-generated orders for backward compatibility
+        "comprehensive_pizza_orders": comprehensive_pizza_orders,  # New comprehensive orders
+        "preference_collections": formatted_collections,
+    }
+
+
+def encode_preferences(preferences: Dict[str, int]) -> PreferenceKey:
+    """
+    Pack an attendee's non-default preferences into a hashable key.
+
+    Each ingredient on the menu is one base-3 digit at its position in
+    PIZZA_INGREDIENTS, with "indifferent" as digit 0, so attendees with
+    the same preferences get equal keys. Preferences that cannot be packed
+    (ingredients no longer on the menu, unexpected values) are kept as
+    sorted (ingredient, preference) pairs.
+
+    Args:
+        preferences (Dict[str, int]): Stored preferences of one attendee
+
+    Returns:
+        PreferenceKey: (packed digits, unpacked preferences)
+    """
+    code = 0
+    unpacked = []
+    for ingredient, preference in preferences.items():
+        position = INGREDIENT_POSITIONS.get(ingredient)
+        if position is not None and preference in PREFERENCE_DIGITS:
+            code += PREFERENCE_DIGITS[preference] * 3**position
+        elif preference != 1:
+            unpacked.append((ingredient, preference))
+
+    return code, tuple(sorted(unpacked))
+
+
+def decode_preferences(key: PreferenceKey) -> Dict[str, int]:
+    """
+    Unpack the non-default preferences from a key made by encode_preferences().
+
+    Args:
+        key (PreferenceKey): Packed preferences
+
+    Returns:
+        Dict[str, int]: Preference of every ingredient that is not indifferent
+    """
+    code, unpacked = key
+    preferences = dict(unpacked)
+
+    position = 0
+    while code:
+        code, digit = divmod(code, 3)
+        if digit:
+            preferences[PIZZA_INGREDIENTS[position]] = DIGIT_PREFERENCES[digit]
+        position += 1
+
+    return preferences
+
+
+def expand_preferences(
+    attendee_ids: List[int], sparse_rows: List[Tuple[int, str, int]]
+) -> List[Tuple[int, str, int]]:
+    """
+    Reconstruct one preference row per ingredient per attendee.
+
+    Only non-default preferences are stored in pizza_preferences, so every
+    ingredient missing for an attendee is filled in as indifferent (1).
+
+    Args:
+        attendee_ids (List[int]): Attendees to expand, in the order to emit them
+        sparse_rows (List[Tuple[int, str, int]]): Stored preference rows
+            Each tuple contains: (attendee_id: int, ingredient: str, preference: int)
+
+    Returns:
+        List[Tuple[int, str, int]]: Dense preference rows in ingredient order
+    """
+    stored: Dict[int, Dict[str, int]] = {}
+    for attendee_id, ingredient, preference in sparse_rows:
+        stored.setdefault(attendee_id, {})[ingredient] = preference
+
+    known_ingredients = set(PIZZA_INGREDIENTS)
+    preferences_data = []
+    for attendee_id in attendee_ids:
+        prefs = stored.get(attendee_id, {})
+        for ingredient in PIZZA_INGREDIENTS:
+            preferences_data.append((attendee_id, ingredient, prefs.get(ingredient, 1)))
+
+        # Keep stored preferences for ingredients no longer on the menu
+        for ingredient, preference in prefs.items():
+            if ingredient not in known_ingredients:
+                preferences_data.append((attendee_id, ingredient, preference))
+
+    return preferences_data
+
+
+def calculate_pizza_orders(
+    attendees: List[Tuple[int, str, int]],
+    ingredient_scores: Dict[str, List[int]],
+    preferences_data: List[Tuple[int, str, int]],
+) -> List[Dict[str, Any]]:
+    """
+    Calculate optimal pizza orders based on attendee preferences.
+
+    This function analyzes the collective preferences of all attendees and creates
+    a list of pizza orders that maximizes satisfaction while considering constraints
+    like total slices needed and ingredient popularity.
+
+    Args:
+        attendees (List[Tuple[int, str, int]]): List of attendee data tuples
+            Each tuple contains: (attendee_id: int, name: str, slice_count: int)
+        ingredient_scores (Dict[str, List[int]]): Dictionary mapping ingredient names
+            to lists of preference scores for each attendee.
+            Preference values: 0 = will not eat, 1 = indifferent, 2 = want to eat
+            Example: {"pepperoni": [2, 1, 0, 2], "mushrooms": [1, 2, 1, 1]}
+        preferences_data (List[Tuple[int, str, int]]): Raw preference data
+            Each tuple contains: (attendee_id: int, ingredient: str, preference: int)
+
+    Returns:
+        List[Dict[str, Any]]: List of pizza order dictionaries, each containing:
+            - "type" (str): Name of the pizza (e.g., "Pepperoni Pizza", "Plain Cheese")
+            - "ingredients" (List[str]): List of ingredient names on this pizza
+            - "slices" (int): Number of slices (always 10)
+            - "description" (str): Human-readable description of the pizza
+            - "target_eaters" (List[str]): Names of attendees who will enjoy this pizza
+
+    Algorithm:
+        1. Calculate total slices needed and required pizzas (10 slices per pizza)
+        2. Score each ingredient based on (want_count - avoid_count) / total_people
+        3. Always include a plain cheese pizza for everyone
+        4. Create specialty pizzas for highly preferred ingredients (score > 0.2)
+        5. If space allows, create combination pizzas with top ingredients
+        6. Determine who will eat each pizza based on preferences
+    """
+    total_slices = sum(attendee[2] for attendee in attendees)
+    total_pizzas_needed = (total_slices + 9) // 10  # Round up
+
+    # Create attendee preferences lookup
+    attendee_preferences = {}
+    attendee_names = {attendee[0]: attendee[1] for attendee in attendees}
+
+    for attendee_id, ingredient, preference in preferences_data:
+        if attendee_id not in attendee_preferences:
+            attendee_preferences[attendee_id] = {}
+        attendee_preferences[attendee_id][ingredient] = preference
+
+    # Helper function to find who will enjoy a pizza
+    def get_pizza_eaters(pizza_ingredients: List[str]) -> List[str]:
+        eaters = []
+        for attendee_id, prefs in attendee_preferences.items():
+            can_eat = True
+            wants_it = False
+
+            for ingredient in pizza_ingredients:
+                if prefs.get(ingredient, 1) == 0:  # Will not eat
+                    can_eat = False
+                    break
+                elif prefs.get(ingredient, 1) == 2:  # Wants it
+                    wants_it = True
+
+            # Include if they can eat it and either want it or are indifferent to all ingredients
+            if can_eat and (wants_it or len(pizza_ingredients) == 0):
+                eaters.append(attendee_names[attendee_id])
+            elif (
+                can_eat and not pizza_ingredients
+            ):  # Plain cheese - everyone who can eat it
+                eaters.append(attendee_names[attendee_id])
+
+        return eaters
+
+    # Calculate ingredient popularity scores
+    ingredient_popularity: Dict[str, float] = {}
+    for ingredient, preferences in ingredient_scores.items():
+        want_count = sum(1 for pref in preferences if pref == 2)
+        avoid_count = sum(1 for pref in preferences if pref == 0)
+        total_people = len(preferences)
+
+        # Score: (want - avoid) / total_people
+        score = (want_count - avoid_count) / total_people
+        ingredient_popularity[ingredient] = score
+
+    # Sort ingredients by popularity
+    sorted_ingredients: List[Tuple[str, float]] = sorted(
+        ingredient_popularity.items(), key=lambda x: x[1], reverse=True
+    )
+
+    # Create pizza orders
+    pizza_orders: List[Dict[str, Any]] = []
+
+    # Plain cheese pizza (always needed)
+    cheese_eaters = get_pizza_eaters([])
+    pizza_orders.append(
+        {
+            "type": "Plain Cheese",
+            "ingredients": [],
+            "slices": 10,
+            "description": "Classic cheese pizza for everyone",
+            "target_eaters": cheese_eaters,
+        }
+    )
+
+    # Create specialty pizzas based on preferences
+    specialty_pizzas_created: int = 0
+    max_specialty_pizzas: int = max(
+        0, total_pizzas_needed - 1
+    )  # Leave room for plain pizza
+
+    for ingredient, score in sorted_ingredients:
+        if specialty_pizzas_created >= max_specialty_pizzas:
+            break
+
+        if score > 0.2:  # Only create if significantly wanted
+            ingredient_eaters = get_pizza_eaters([ingredient])
+            pizza_orders.append(
+                {
+                    "type": f"{ingredient.title()} Pizza",
+                    "ingredients": [ingredient],
+                    "slices": 10,
+                    "description": f"Pizza with {ingredient} topping",
+                    "target_eaters": ingredient_eaters,
+                }
+            )
+            specialty_pizzas_created += 1
+
+    # If we have room for more pizzas, create combination pizzas
+    remaining_pizzas: int = max_specialty_pizzas - specialty_pizzas_created
+    if remaining_pizzas > 0:
+        # Create combination pizzas with top ingredients
+        top_ingredients: List[str] = [
+            ing for ing, score in sorted_ingredients[:4] if score > 0.1
+        ]
+        if len(top_ingredients) >= 2:
+            supreme_ingredients = top_ingredients[:3]  # Max 3 ingredients per combo
+            supreme_eaters = get_pizza_eaters(supreme_ingredients)
+            pizza_orders.append(
+                {
+                    "type": "Supreme Pizza",
+                    "ingredients": supreme_ingredients,
+                    "slices": 10,
+                    "description": f"Combination pizza with {', '.join(supreme_ingredients)}",
+                    "target_eaters": supreme_eaters,
+                }
+            )
+
+    return pizza_orders
+
+
+def format_pizza_count(slices: int) -> str:
+    """
+    Format pizza count based on 8 slices per pizza, rounded up to nearest 4.
+
+    Args:
+        slices (int): Number of slices needed
+
+    Returns:
+        str: Formatted pizza count string (e.g., "1 1/2 pizzas, 2 slices excess")
+    """
+    slices_per_pizza = 8
+    whole_pizzas = slices // slices_per_pizza
+    remaining_slices = slices % slices_per_pizza
+
+    # Round up remaining slices to nearest 4
+    rounded_up_slices = ((remaining_slices + 3) // 4) * 4 if remaining_slices > 0 else 0
+    excess_slices = rounded_up_slices - remaining_slices
+
+    result = ""
+
+    if whole_pizzas > 0:
+        result += str(whole_pizzas)
+        if rounded_up_slices > 0:
+            if rounded_up_slices == 4:
+                result += " 1/2"
+            elif rounded_up_slices == 8:
+                result += " 1"
+            result += " pizzas"
+        else:
+            result += " pizza" if whole_pizzas == 1 else " pizzas"
+    else:
+        # Less than a full pizza
+        if rounded_up_slices == 4:
+            result = "1/2 pizza"
+        elif rounded_up_slices == 8:
+            result = "1 pizza"
+        else:
+            result = "1 pizza"  # fallback
+
+    if excess_slices > 0:
+        plural = "s" if excess_slices > 1 else ""
+        result += f" ({excess_slices} slice{plural} excess)"
+
+    return result
+
+
+def calculate_comprehensive_pizza_orders(
+    attendees: List[Tuple[int, str, int]],
+    preferences_data: List[Tuple[int, str, int]],
+    selections: List[Tuple[int, str, int]],
+    custom_pizzas: List[Tuple[str, str, List[str]]],
+) -> List[Dict[str, Any]]:
+    """
+    Calculate comprehensive pizza orders including existing selections, custom pizzas, and AI recommendations.
+
+    Args:
+        attendees (List[Tuple[int, str, int]]): List of attendee data
+        preferences_data (List[Tuple[int, str, int]]): Raw preference data
+        selections (List[Tuple[int, str, int]]): Existing pizza selections
+            Each tuple contains: (attendee_id: int, pizza_type: str, slice_count: int)
+        custom_pizzas (List[Tuple[str, str, List[str]]]): Selected named pizzas
+            Each tuple contains: (pizza_type: str, name: str, ingredients: List[str])
+
+    Returns:
+        List[Dict[str, Any]]: Comprehensive list of pizza orders with source information
+    """
+    comprehensive_orders = []
+
+    # Create attendee preferences and names lookup
+    attendee_preferences = {}
+    attendee_names = {attendee[0]: attendee[1] for attendee in attendees}
+
+    for attendee_id, ingredient, preference in preferences_data:
+        if attendee_id not in attendee_preferences:
+            attendee_preferences[attendee_id] = {}
+        attendee_preferences[attendee_id][ingredient] = preference
+
+    # Helper function to find who will enjoy a pizza
+    def get_pizza_eaters(pizza_ingredients: List[str]) -> List[str]:
+        eaters = []
+        for attendee_id, prefs in attendee_preferences.items():
+            can_eat = True
+            wants_it = False
+
+            for ingredient in pizza_ingredients:
+                if prefs.get(ingredient, 1) == 0:  # Will not eat
+                    can_eat = False
+                    break
+                elif prefs.get(ingredient, 1) == 2:  # Wants it
+                    wants_it = True
+
+            # Include if they can eat it and either want it or are indifferent to all ingredients
+            if can_eat and (wants_it or len(pizza_ingredients) == 0):
+                eaters.append(attendee_names[attendee_id])
+            elif (
+                can_eat and not pizza_ingredients
+            ):  # Plain cheese - everyone who can eat it
+                eaters.append(attendee_names[attendee_id])
+
+        return eaters
+
+    # Total slices and eaters per pizza type, with eaters in attendee order
+    selection_totals: Dict[str, List[Any]] = {}
+    for attendee_id, pizza_type, slice_count in sorted(selections):
+        if pizza_type not in selection_totals:
+            selection_totals[pizza_type] = [0, []]
+        selection_totals[pizza_type][0] += slice_count
+        selection_totals[pizza_type][1].append(attendee_names[attendee_id])
+
+    # 1. Existing pizza selections (boring basic pizzas)
+    # Map pizza type IDs to their ingredients
+    pizza_type_ingredients = {
+        "pepperoni": ["pepperoni"],
+        "cheese": [],
+        "pineapple-ham": ["pineapple", "ham"],
+        "spinach-tomato-pineapple": ["spinach", "tomatoes", "pineapple"],
+    }
+
+    # Add existing pizza orders
+    for pizza_type, (total_slices, eater_names) in sorted(selection_totals.items()):
+        if total_slices > 0:
+            ingredients = pizza_type_ingredients.get(pizza_type, [])
+            pizza_name = pizza_type.replace("-", " ").title()
+
+            comprehensive_orders.append(
+                {
+                    "type": f"{pizza_name} (Boring Basic)",
+                    "ingredients": ingredients,
+                    "slices": total_slices,
+                    "pizza_count": format_pizza_count(total_slices),
+                    "description": f"Pre-selected {pizza_name.lower()} pizza",
+                    "target_eaters": eater_names,
+                    "source": "boring_basic",
+                    "calculation_method": "Selected by attendees from boring basic pizza options",
+                }
+            )
+
+    # 2. Custom pizzas that attendees selected
+    for custom_pizza_id, pizza_name, ingredients in custom_pizzas:
+        total_slices, eater_names = selection_totals.get(custom_pizza_id, [0, []])
+        if total_slices > 0:
+            comprehensive_orders.append(
+                {
+                    "type": f"{pizza_name} (Custom)",
+                    "ingredients": ingredients,
+                    "slices": total_slices,
+                    "pizza_count": format_pizza_count(total_slices),
+                    "description": f"Custom created pizza: {pizza_name}",
+                    "target_eaters": eater_names,
+                    "source": "custom",
+                    "calculation_method": "Created by community, selected by attendees",
+                }
+            )
+
+    # 3. Add AI-generated recommendations
+    # Organize preferences by ingredient for AI calculation
+    ingredient_scores = {}
+    for attendee_id, ingredient, preference in preferences_data:
+        if ingredient not in ingredient_scores:
+            ingredient_scores[ingredient] = []
+        ingredient_scores[ingredient].append(preference)
+
+    ai_orders = calculate_pizza_orders(attendees, ingredient_scores, preferences_data)
+
+    for ai_order in ai_orders:
+        ai_order["source"] = "ai_generated"
+        ai_order["calculation_method"] = (
+            "AI-optimized based on attendee preferences and slice requirements"
+        )
+        ai_order["pizza_count"] = format_pizza_count(ai_order["slices"])
+        ai_order["type"] = f"{ai_order['type']} (AI Recommended)"
+        comprehensive_orders.append(ai_order)
+
+    return comprehensive_orders
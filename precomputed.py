@@ -0,0 +1,61 @@
+"""
+JSON responses that are serialized once and served many times.
+"""
+
+import gzip
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are served without it
+    brotli = None
+
+
+class PrecomputedResponse:
+    """
+    JSON response serialized once, with compressed variants and strong ETags.
+
+    Serving one is a memory copy: the body is never re-encoded, and clients
+    that already hold the current version get a 304. Each compressed variant
+    is built the first time a client asks for it.
+    """
+
+    def __init__(self, data: Any) -> None:
+        self.body = current_app.json.response(data).get_data()
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+
+        # Each encoding is a different representation, so it gets its own ETag
+        self.variants: Dict[Optional[str], Tuple[bytes, str]] = {
+            None: (self.body, self.digest)
+        }
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, str]:
+        """Get the body and ETag of one encoding, compressing it on first use."""
+        if encoding not in self.variants:
+            if encoding == "br":
+                body = brotli.compress(self.body)
+            else:
+                body = gzip.compress(self.body, 9)
+            self.variants[encoding] = (body, f"{self.digest}-{encoding}")
+        return self.variants[encoding]
+
+    def to_response(self):
+        """Build the response for the current request's Accept-Encoding and ETag."""
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate == "br" and brotli is None:
+                continue
+            if request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        body, etag = self.variant(encoding)
+        response = current_app.response_class(body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(etag)
+        return response.make_conditional(request)
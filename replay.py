@@ -0,0 +1,255 @@
+"""
+Replay captured traffic against a running instance of the app.
+
+Reads the NDJSON files recorded with CAPTURE_DIR set and sends their
+requests to --target in the order and with the spacing they arrived in,
+sped up by --speed, from up to --concurrency requests in flight. Reports
+throughput, latency percentiles overall and per route, and how many
+requests failed because SQLite's write lock stayed busy past busy_timeout.
+The report is written as JSON so runs can be compared by scripts.
+
+Replay against scratch copies of the databases: captured joins and
+submissions are written again, and joins to a party that already has an
+attendee of the same name are refused.
+
+Usage:
+    python replay.py CAPTURE_FILE... [--target http://127.0.0.1:8000]
+                     [--speed 10] [--concurrency 8] [--output report.json]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_TARGET = "http://127.0.0.1:8000"
+# Error the app reports when a write gave up waiting for SQLite's lock
+LOCKED_ERROR = b"database is locked"
+PERCENTILES = [50, 90, 95, 99]
+
+
+class Result(NamedTuple):
+    """Outcome of one replayed request."""
+
+    route: str
+    status: Optional[int]
+    locked: bool
+    latency: float
+    # Seconds the request was sent behind schedule, waiting for a free slot
+    lag: float
+    error: Optional[str]
+
+
+def load_capture(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Read captured requests from NDJSON files.
+
+    Args:
+        paths (List[str]): Capture files, e.g. one per worker process
+
+    Returns:
+        List[Dict[str, Any]]: Captured requests in order of arrival
+    """
+    entries = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def send(target: str, entry: Dict[str, Any], timeout: float) -> Tuple[int, bytes]:
+    """
+    Send one captured request.
+
+    Args:
+        target (str): Base URL of the app
+        entry (Dict[str, Any]): Captured request
+        timeout (float): Seconds to wait for the response
+
+    Returns:
+        Tuple[int, bytes]: HTTP status and body of the response
+    """
+    body = entry.get("body")
+    request = urllib.request.Request(
+        target.rstrip("/") + entry["path"],
+        data=None if body is None else json.dumps(body).encode(),
+        method=entry["method"],
+        headers={
+            "Content-Type": "application/json",
+            "Accept-Encoding": entry.get("encoding") or "identity",
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+
+def replay(
+    entries: List[Dict[str, Any]],
+    target: str,
+    speed: float,
+    concurrency: int,
+    timeout: float,
+) -> List[Result]:
+    """
+    Send captured requests on their original schedule, compressed by speed.
+
+    Args:
+        entries (List[Dict[str, Any]]): Captured requests in order of arrival
+        target (str): Base URL of the app
+        speed (float): How many times faster than recorded to send them
+        concurrency (int): Most requests in flight at once
+        timeout (float): Seconds to wait for each response
+
+    Returns:
+        List[Result]: Outcome of every request
+    """
+    results: List[Result] = []
+    results_lock = threading.Lock()
+
+    def run(entry: Dict[str, Any], due: float) -> None:
+        started = time.perf_counter()
+        status, body, error = None, b"", None
+        try:
+            status, body = send(target, entry, timeout)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        result = Result(
+            entry.get("route") or entry["path"],
+            status,
+            status is not None and status >= 500 and LOCKED_ERROR in body,
+            time.perf_counter() - started,
+            max(started - due, 0.0),
+            error,
+        )
+        with results_lock:
+            results.append(result)
+
+    first = entries[0]["t"] if entries else 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for position, entry in enumerate(entries, start=1):
+            due = start + (entry["t"] - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, entry, due)
+            if position % 1000 == 0:
+                print(f"{position}/{len(entries)} requests sent", file=sys.stderr)
+
+    return results
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """Get the nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    index = max(int(len(values) * rank / 100 + 0.5) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def latency_summary(results: List[Result]) -> Dict[str, float]:
+    """Latency percentiles and maximum of some results, in milliseconds."""
+    latencies = sorted(result.latency * 1000 for result in results)
+    summary = {
+        f"p{rank}": round(percentile(latencies, rank), 2) for rank in PERCENTILES
+    }
+    summary["max"] = round(latencies[-1], 2) if latencies else 0.0
+    return summary
+
+
+def summarize(results: List[Result], seconds: float) -> Dict[str, Any]:
+    """
+    Build the replay report.
+
+    Args:
+        results (List[Result]): Outcome of every request
+        seconds (float): Wall-clock duration of the replay
+
+    Returns:
+        Dict[str, Any]: Throughput, statuses, lock failures and latencies
+    """
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    routes: Dict[str, List[Result]] = {}
+    for result in results:
+        if result.error:
+            errors[result.error] = errors.get(result.error, 0) + 1
+        else:
+            statuses[str(result.status)] = statuses.get(str(result.status), 0) + 1
+        routes.setdefault(result.route, []).append(result)
+
+    return {
+        "requests": len(results),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(results) / seconds, 2) if seconds else 0.0,
+        "statuses": statuses,
+        "database_locked": sum(1 for result in results if result.locked),
+        "errors": errors,
+        "max_lag_ms": round(max((r.lag for r in results), default=0.0) * 1000, 2),
+        "latency_ms": latency_summary(results),
+        "routes": {
+            route: {
+                "requests": len(route_results),
+                "database_locked": sum(1 for r in route_results if r.locked),
+                "latency_ms": latency_summary(route_results),
+            }
+            for route, route_results in sorted(routes.items())
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("captures", nargs="+", help="NDJSON capture files")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="base URL of the app")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="replay this many times faster (1-100)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="most requests in flight at once"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="seconds to wait for each response"
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    if not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    entries = load_capture(args.captures)
+    started = time.perf_counter()
+    results = replay(entries, args.target, args.speed, args.concurrency, args.timeout)
+
+    report = {
+        "target": args.target,
+        "speed": args.speed,
+        "concurrency": args.concurrency,
+        **summarize(results, time.perf_counter() - started),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
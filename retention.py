@@ -0,0 +1,334 @@
+"""
+Expire abandoned pizza parties and old raw answers.
+
+Pizza parties nobody has joined for PIZZA_PARTY_RETENTION_DAYS are deleted
+along with their preferences and selections (through ON DELETE CASCADE).
+Raw times-table answers older than RESPONSE_RETENTION_DAYS are deleted too;
+agg_pair, agg_user and agg_user_pair already hold their totals and are left
+alone, so the heatmaps and user stats are unchanged. A retention period of 0 keeps
+everything.
+
+Deletes run in small batches, each its own short transaction, and the
+freed pages are handed back with incremental_vacuum steps, so live traffic
+never waits on the write lock for long. Each worker runs a background
+thread that does a pass every RETENTION_INTERVAL seconds; a flock on
+RETENTION_LOCK_FILE makes sure only one process does each pass, and the
+file records when the last one finished.
+
+Usage:
+    python retention.py           Run one pass now
+    python retention.py --convert Switch existing databases to incremental
+                                  auto-vacuum (a full VACUUM, so stop the
+                                  app first)
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from storage import PIZZA, STORES, TIMES_TABLES, connect, database_exists
+from structured_logging import configure_logging, get_logger
+
+try:
+    import fcntl
+except ImportError:  # Optional: without it every process runs its own passes
+    fcntl = None
+
+PIZZA_PARTY_RETENTION_DAYS = float(os.environ.get("PIZZA_PARTY_RETENTION_DAYS", "90"))
+RESPONSE_RETENTION_DAYS = float(os.environ.get("RESPONSE_RETENTION_DAYS", "365"))
+# Seconds between retention passes; 0 turns the background thread off
+RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", "3600"))
+RETENTION_LOCK_FILE = os.environ.get("RETENTION_LOCK_FILE", "retention.lock")
+# Rows deleted per transaction
+RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", "500"))
+# Seconds to wait between batches so live writers get the lock
+BATCH_PAUSE = 0.05
+# Pages handed back per incremental_vacuum step
+VACUUM_STEP_PAGES = 256
+# PRAGMA auto_vacuum value for incremental mode
+AUTO_VACUUM_INCREMENTAL = 2
+
+log = get_logger(__name__)
+
+
+def expired_parties(days: float) -> List[str]:
+    """
+    Find the pizza parties nobody has joined for a number of days.
+
+    Args:
+        days (float): Retention period
+
+    Returns:
+        List[str]: Party numbers of the expired parties
+    """
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT party_number FROM pizza_attendees
+        GROUP BY party_number
+        HAVING MAX(timestamp) < datetime('now', ?)
+    """,
+        (f"-{days} days",),
+    )
+    parties = [row[0] for row in cur.fetchall()]
+    conn.close()
+    return parties
+
+
+def expire_pizza_parties(days: float) -> int:
+    """
+    Delete the attendees of expired pizza parties, in batches.
+
+    Preferences and selections go with them through ON DELETE CASCADE, and
+    a trigger bumps each party's version so cached summaries are dropped.
+    A party that someone joins while it is being expired is kept.
+
+    Args:
+        days (float): Retention period
+
+    Returns:
+        int: Number of attendees deleted
+    """
+    deleted = 0
+    conn = connect(PIZZA)
+    cur = conn.cursor()
+
+    try:
+        for party_number in expired_parties(days):
+            while True:
+                cur.execute(
+                    """
+                    DELETE FROM pizza_attendees WHERE id IN (
+                        SELECT id FROM pizza_attendees
+                        WHERE party_number = ?
+                          AND (SELECT MAX(timestamp) FROM pizza_attendees
+                               WHERE party_number = ?) < datetime('now', ?)
+                        LIMIT ?
+                    )
+                """,
+                    (party_number, party_number, f"-{days} days", RETENTION_BATCH_SIZE),
+                )
+                conn.commit()
+                if cur.rowcount <= 0:
+                    break
+                deleted += cur.rowcount
+                time.sleep(BATCH_PAUSE)
+    finally:
+        conn.close()
+
+    return deleted
+
+
+def expire_responses(days: float) -> int:
+    """
+    Delete raw times-table answers older than a number of days, in batches.
+
+    Args:
+        days (float): Retention period
+
+    Returns:
+        int: Number of answers deleted
+    """
+    deleted = 0
+    conn = connect(TIMES_TABLES)
+    cur = conn.cursor()
+
+    try:
+        while True:
+            cur.execute(
+                """
+                DELETE FROM responses WHERE id IN (
+                    SELECT id FROM responses
+                    WHERE timestamp < datetime('now', ?)
+                    LIMIT ?
+                )
+            """,
+                (f"-{days} days", RETENTION_BATCH_SIZE),
+            )
+            conn.commit()
+            if cur.rowcount <= 0:
+                break
+            deleted += cur.rowcount
+            time.sleep(BATCH_PAUSE)
+    finally:
+        conn.close()
+
+    return deleted
+
+
+def incremental_vacuum(store: str) -> int:
+    """
+    Hand a database's free pages back to the file system, a few at a time.
+
+    Does nothing unless the database uses incremental auto-vacuum.
+
+    Args:
+        store (str): TIMES_TABLES or PIZZA
+
+    Returns:
+        int: Number of pages freed
+    """
+    freed = 0
+    conn = connect(store)
+
+    try:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            freed += free_pages - remaining
+            free_pages = remaining
+            time.sleep(BATCH_PAUSE)
+    finally:
+        conn.close()
+
+    return freed
+
+
+def enable_incremental_vacuum(store: str) -> bool:
+    """
+    Switch an existing database to incremental auto-vacuum.
+
+    This rewrites the whole file with VACUUM and holds the write lock while
+    it does, so it is only run from the command line.
+
+    Args:
+        store (str): TIMES_TABLES or PIZZA
+
+    Returns:
+        bool: Whether the database had to be converted
+    """
+    conn = connect(store)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+
+def run_retention() -> Dict[str, int]:
+    """
+    Run one retention pass over both databases.
+
+    Databases the app has not created yet are skipped.
+
+    Returns:
+        Dict[str, int]: Rows deleted and pages freed
+    """
+    stats = {"attendees_deleted": 0, "responses_deleted": 0}
+    if PIZZA_PARTY_RETENTION_DAYS > 0 and database_exists(PIZZA):
+        stats["attendees_deleted"] = expire_pizza_parties(PIZZA_PARTY_RETENTION_DAYS)
+    if RESPONSE_RETENTION_DAYS > 0 and database_exists(TIMES_TABLES):
+        stats["responses_deleted"] = expire_responses(RESPONSE_RETENTION_DAYS)
+    for store in STORES:
+        if database_exists(store):
+            stats[f"{store}_pages_freed"] = incremental_vacuum(store)
+    return stats
+
+
+def last_pass_time(lock_file) -> float:
+    """
+    Read when the last retention pass finished from the lock file.
+
+    Args:
+        lock_file: The open lock file
+
+    Returns:
+        float: time.time() of the last pass, or 0 if none is recorded
+    """
+    lock_file.seek(0)
+    try:
+        return float(lock_file.read().strip() or 0)
+    except ValueError:
+        return 0.0
+
+
+def run_retention_if_due() -> float:
+    """
+    Run a retention pass unless another process is running one or ran one
+    less than RETENTION_INTERVAL seconds ago.
+
+    The lock file holds the time the last pass finished, so a restarted
+    worker runs a pass as soon as one is due rather than a full interval
+    after it starts.
+
+    Returns:
+        float: Seconds until the next pass is due
+    """
+    with open(RETENTION_LOCK_FILE, "a+") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return RETENTION_INTERVAL
+
+        remaining = last_pass_time(lock_file) + RETENTION_INTERVAL - time.time()
+        if remaining > 0:
+            return remaining
+
+        started = time.monotonic()
+        stats = run_retention()
+        lock_file.truncate(0)
+        lock_file.write(f"{time.time()}\n")
+        log.info(
+            "Retention pass finished",
+            seconds=round(time.monotonic() - started, 3),
+            **stats,
+        )
+        return RETENTION_INTERVAL
+
+
+def retention_loop() -> None:
+    """Run retention passes forever, logging rather than dying on errors."""
+    while True:
+        try:
+            delay = run_retention_if_due()
+        except Exception:
+            log.exception("Retention pass failed")
+            delay = RETENTION_INTERVAL
+        time.sleep(max(delay, 1.0))
+
+
+def start_retention_thread() -> None:
+    """Start this process's background retention thread, unless turned off."""
+    if RETENTION_INTERVAL <= 0:
+        return
+    threading.Thread(target=retention_loop, name="retention", daemon=True).start()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help="switch the databases to incremental auto-vacuum (stop the app first)",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+
+    if args.convert:
+        for store in STORES:
+            if not database_exists(store):
+                continue
+            if enable_incremental_vacuum(store):
+                log.info("Switched to incremental auto-vacuum", store=store)
+            else:
+                log.info("Already uses incremental auto-vacuum", store=store)
+        return 0
+
+    log.info("Retention pass finished", **run_retention())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Read-only snapshots of the databases for heavy reads.
+
+Every SNAPSHOT_INTERVAL seconds each store in SNAPSHOT_STORES is copied
+with SQLite's online backup API to a snapshot file next to it (e.g.
+pizza.db.snapshot), which is swapped into place with a rename. Only the
+pizza store has snapshot readers, so by default only it is copied. The
+copy is made in a single backup step, which in WAL mode is just a long
+read: writers carry on while it runs. Heavy read-only queries open the
+snapshot through connect_snapshot() so they never hold up a writer, and
+fall back to the live database while the snapshot is missing or older than
+SNAPSHOT_MAX_AGE seconds, so what they read can be that far behind. The
+latest snapshot also serves as a hot backup.
+
+Each worker runs a background thread that refreshes the snapshots; a flock
+next to each snapshot makes sure only one process copies a store at a time.
+"""
+
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from storage import PIZZA, connect, database_exists, database_path
+from structured_logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Optional: without it every process refreshes the snapshots
+    fcntl = None
+
+# Seconds between refreshes; 0 turns the background thread off
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "60"))
+# Oldest snapshot connect_snapshot() will read from; one missed refresh is
+# tolerated before readers go back to the live database
+SNAPSHOT_MAX_AGE = float(os.environ.get("SNAPSHOT_MAX_AGE", "90"))
+# Stores that are copied; add times_tables to keep a hot backup of it too
+SNAPSHOT_STORES = [
+    name.strip()
+    for name in os.environ.get("SNAPSHOT_STORES", PIZZA).split(",")
+    if name.strip()
+]
+
+log = get_logger(__name__)
+
+
+def snapshot_path(store: str) -> str:
+    """Get the snapshot file of a store."""
+    return f"{database_path(store)}.snapshot"
+
+
+def snapshot_age(store: str) -> Optional[float]:
+    """Get how many seconds ago a store's snapshot was taken, or None if it has none."""
+    try:
+        return time.time() - os.stat(snapshot_path(store)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def refresh_snapshot(store: str) -> None:
+    """
+    Replace a store's snapshot with a fresh copy of the live database.
+
+    Args:
+        store (str): TIMES_TABLES or PIZZA
+    """
+    path = snapshot_path(store)
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    source = connect(store)
+    target = sqlite3.connect(temporary)
+    try:
+        # A backup in steps starts over whenever another connection commits,
+        # so under steady writes it might never finish
+        source.backup(target)
+        # Readers open the snapshot as immutable, which a WAL file cannot be
+        target.execute("PRAGMA journal_mode = DELETE").close()
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(temporary, path)
+
+
+def refresh_snapshots_if_due() -> None:
+    """
+    Refresh the snapshot of each store in SNAPSHOT_STORES unless another
+    process is refreshing it or it is less than SNAPSHOT_INTERVAL seconds
+    old. Databases the app has not created yet are skipped.
+    """
+    for store in SNAPSHOT_STORES:
+        if not database_exists(store):
+            continue
+
+        with open(f"{snapshot_path(store)}.lock", "a") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+
+            age = snapshot_age(store)
+            if age is not None and age < SNAPSHOT_INTERVAL:
+                continue
+
+            started = time.monotonic()
+            refresh_snapshot(store)
+            log.debug(
+                "Refreshed snapshot",
+                store=store,
+                seconds=round(time.monotonic() - started, 3),
+            )
+
+
+def connect_snapshot(
+    store: str, max_age: float = SNAPSHOT_MAX_AGE
+) -> sqlite3.Connection:
+    """
+    Open a read-only connection to a store's snapshot, or to the live
+    database if the snapshot is missing or too old.
+
+    Args:
+        store (str): TIMES_TABLES or PIZZA
+        max_age (float): Oldest snapshot, in seconds, the caller accepts
+
+    Returns:
+        sqlite3.Connection: Open connection to the snapshot or the database
+    """
+    age = snapshot_age(store)
+    if age is None or age > max_age:
+        log.debug("Reading from the live database", store=store, snapshot_age=age)
+        return connect(store)
+
+    # Snapshots are replaced, never written to, so they need no locking
+    uri = pathlib.Path(snapshot_path(store)).resolve().as_uri()
+    return sqlite3.connect(f"{uri}?mode=ro&immutable=1", uri=True)
+
+
+def snapshot_loop() -> None:
+    """Refresh the snapshots forever, logging rather than dying on errors."""
+    while True:
+        try:
+            refresh_snapshots_if_due()
+        except Exception:
+            log.exception("Snapshot refresh failed")
+        time.sleep(SNAPSHOT_INTERVAL)
+
+
+def start_snapshot_thread() -> None:
+    """Start this process's background snapshot thread, unless turned off."""
+    if SNAPSHOT_INTERVAL <= 0:
+        return
+    threading.Thread(target=snapshot_loop, name="snapshots", daemon=True).start()
@@ -0,0 +1,53 @@
+"""
+Startup timings of the app's subsystems.
+
+app.py imports this module first and records how long the shared imports,
+each blueprint's import and each blueprint's first-use initialization take.
+Set STARTUP_PROFILE=1 to log every stage as it finishes, along with the
+time since the worker started importing the app, to compare boot and
+respawn times between deploys.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from structured_logging import get_logger
+
+STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "") not in ("", "0")
+# When the app started importing
+STARTED = time.perf_counter()
+# Milliseconds taken by each stage so far
+TIMINGS: Dict[str, float] = {}
+
+log = get_logger(__name__)
+
+
+def record(stage: str, started: float) -> None:
+    """
+    Record a stage that began at a perf_counter() time and has just finished.
+
+    Args:
+        stage (str): Name of the stage, e.g. "import pizza"
+        started (float): time.perf_counter() when the stage began
+    """
+    finished = time.perf_counter()
+    TIMINGS[stage] = round((finished - started) * 1000, 2)
+    if STARTUP_PROFILE:
+        log.info(
+            "Startup stage finished",
+            stage=stage,
+            ms=TIMINGS[stage],
+            since_start_ms=round((finished - STARTED) * 1000, 2),
+        )
+
+
+@contextmanager
+def profiled(stage: str) -> Iterator[None]:
+    """Record how long the block takes as a stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, started)
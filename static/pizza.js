@@ -292,9 +292,12 @@ document.addEventListener("DOMContentLoaded", async function () {
     }
   }
 
-  // Setup pizza slice spinners functionality
-  function setupPizzaSliceSpinners() {
-    const spinnerButtons = document.querySelectorAll(".mini-spinner-btn");
+  // Slices wanted per pizza id, kept while the pizza list is searched or paged
+  const pizzaSlicesWanted = {};
+
+  // Setup pizza slice spinners functionality for the spinners inside root
+  function setupPizzaSliceSpinners(root = document) {
+    const spinnerButtons = root.querySelectorAll(".mini-spinner-btn");
 
     spinnerButtons.forEach((button) => {
       button.addEventListener("click", (e) => {
@@ -314,6 +317,7 @@ document.addEventListener("DOMContentLoaded", async function () {
           } else if (action === "increase" && currentValue < 10) {
             input.value = currentValue + 1;
           }
+          pizzaSlicesWanted[pizzaType] = parseInt(input.value);
         }
       });
     });
@@ -358,13 +362,69 @@ document.addEventListener("DOMContentLoaded", async function () {
   setupShareButton();
   updateShareButtonVisibility();
 
-  // Populate available pizzas (hardcoded + custom) in the eater form
+  const pizzaSearchInput = document.getElementById("pizzaSearch");
+  const pizzaCanEatFilter = document.getElementById("pizzaCanEatFilter");
+  const loadMorePizzasButton = document.getElementById("loadMorePizzas");
+  // Cursor of the next page of custom pizzas, or null when all are shown
+  let availablePizzasCursor = null;
+  // Incremented per request so responses to outdated searches are ignored
+  let availablePizzasRequest = 0;
+
+  // Build the /pizza/available URL for the current search and filter
+  function availablePizzasUrl(cursor) {
+    const params = new URLSearchParams();
+
+    const search = pizzaSearchInput ? pizzaSearchInput.value.trim() : "";
+    if (search.length >= 3) {
+      params.set("q", search);
+    }
+
+    if (pizzaCanEatFilter && pizzaCanEatFilter.checked) {
+      const wontEat = getAllIngredients().filter((ingredient) =>
+        document.querySelector(
+          `input[name="pref_${ingredient}"][value="0"]:checked`,
+        ),
+      );
+      if (wontEat.length > 0) {
+        params.set("exclude", wontEat.join(","));
+      }
+    }
+
+    if (cursor !== null) {
+      params.set("cursor", cursor);
+    }
+
+    const query = params.toString();
+    return query ? `/pizza/available?${query}` : "/pizza/available";
+  }
+
+  // Show the "Show more pizzas" button only when there is another page
+  function updateLoadMorePizzas(nextCursor) {
+    availablePizzasCursor = nextCursor;
+    if (loadMorePizzasButton) {
+      loadMorePizzasButton.style.display =
+        nextCursor === null ? "none" : "block";
+    }
+  }
+
+  // Append custom pizza options, with their spinners, to the container
+  function appendCustomPizzaOptions(pizzaOptionsContainer, customPizzas) {
+    customPizzas.forEach((pizza) => {
+      const pizzaOption = createPizzaOption(pizza);
+      pizzaOptionsContainer.appendChild(pizzaOption);
+      setupPizzaSliceSpinners(pizzaOption);
+    });
+  }
+
+  // Populate available pizzas (hardcoded + first page of custom) in the eater form
   async function populateAvailablePizzas() {
+    const request = ++availablePizzasRequest;
+
     try {
-      const response = await fetch("/pizza/available");
+      const response = await fetch(availablePizzasUrl(null));
       const data = await response.json();
 
-      if (response.ok) {
+      if (response.ok && request === availablePizzasRequest) {
         const pizzaOptionsContainer = document.querySelector(".pizza-options");
         if (!pizzaOptionsContainer) return;
 
@@ -375,6 +435,7 @@ document.addEventListener("DOMContentLoaded", async function () {
         data.hardcoded_pizzas.forEach((pizza) => {
           const pizzaOption = createPizzaOption(pizza);
           pizzaOptionsContainer.appendChild(pizzaOption);
+          setupPizzaSliceSpinners(pizzaOption);
         });
 
         // Add custom pizzas if any exist
@@ -385,20 +446,54 @@ document.addEventListener("DOMContentLoaded", async function () {
           separator.innerHTML = "<strong>🍕 Custom Pizzas</strong>";
           pizzaOptionsContainer.appendChild(separator);
 
-          data.custom_pizzas.forEach((pizza) => {
-            const pizzaOption = createPizzaOption(pizza);
-            pizzaOptionsContainer.appendChild(pizzaOption);
-          });
+          appendCustomPizzaOptions(pizzaOptionsContainer, data.custom_pizzas);
         }
 
-        // Reinitialize pizza slice spinners for new elements
-        setupPizzaSliceSpinners();
+        updateLoadMorePizzas(data.next_cursor);
       }
     } catch (error) {
       console.error("Error fetching available pizzas:", error);
     }
   }
 
+  // Append the next page of custom pizzas
+  async function loadMorePizzas() {
+    if (availablePizzasCursor === null) return;
+    const request = ++availablePizzasRequest;
+
+    try {
+      const response = await fetch(availablePizzasUrl(availablePizzasCursor));
+      const data = await response.json();
+
+      if (response.ok && request === availablePizzasRequest) {
+        const pizzaOptionsContainer = document.querySelector(".pizza-options");
+        if (!pizzaOptionsContainer) return;
+
+        appendCustomPizzaOptions(pizzaOptionsContainer, data.custom_pizzas);
+        updateLoadMorePizzas(data.next_cursor);
+      }
+    } catch (error) {
+      console.error("Error fetching more pizzas:", error);
+    }
+  }
+
+  if (loadMorePizzasButton) {
+    loadMorePizzasButton.addEventListener("click", loadMorePizzas);
+  }
+
+  // Re-run the search shortly after the user stops typing
+  let pizzaSearchTimeout = null;
+  if (pizzaSearchInput) {
+    pizzaSearchInput.addEventListener("input", () => {
+      clearTimeout(pizzaSearchTimeout);
+      pizzaSearchTimeout = setTimeout(populateAvailablePizzas, 300);
+    });
+  }
+
+  if (pizzaCanEatFilter) {
+    pizzaCanEatFilter.addEventListener("change", populateAvailablePizzas);
+  }
+
   // Create a pizza option element
   function createPizzaOption(pizza) {
     const pizzaOption = document.createElement("div");
@@ -416,7 +511,7 @@ document.addEventListener("DOMContentLoaded", async function () {
       </div>
       <div class="pizza-slice-spinner">
         <button type="button" class="mini-spinner-btn" data-pizza="${pizza.id}" data-action="decrease">-</button>
-        <input type="number" class="pizza-slice-input" data-pizza="${pizza.id}" value="0" min="0" max="10" readonly>
+        <input type="number" class="pizza-slice-input" data-pizza="${pizza.id}" value="${pizzaSlicesWanted[pizza.id] || 0}" min="0" max="10" readonly>
         <button type="button" class="mini-spinner-btn" data-pizza="${pizza.id}" data-action="increase">+</button>
       </div>
     `;
@@ -775,14 +870,12 @@ document.addEventListener("DOMContentLoaded", async function () {
       }
     });
 
-    // Calculate total slices from all pizza selections
-    const pizzaSliceInputs = document.querySelectorAll(".pizza-slice-input");
+    // Calculate total slices from all pizza selections, including pizzas
+    // currently hidden by the search
     let totalSlices = 0;
     const existingPizza_slicesWanted = {};
 
-    pizzaSliceInputs.forEach((input) => {
-      const pizzaType = input.getAttribute("data-pizza");
-      const slices = parseInt(input.value) || 0;
+    Object.entries(pizzaSlicesWanted).forEach(([pizzaType, slices]) => {
       if (slices > 0) {
         existingPizza_slicesWanted[pizzaType] = slices;
       }
@@ -828,6 +921,9 @@ document.addEventListener("DOMContentLoaded", async function () {
         } else {
           alert("Successfully joined the pizza party! 🍕");
           eaterForm.reset();
+          Object.keys(pizzaSlicesWanted).forEach(
+            (pizzaType) => delete pizzaSlicesWanted[pizzaType],
+          );
           showScreen(startScreen);
         }
       } else {
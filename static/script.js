@@ -21,6 +21,30 @@ if (!user_id) {
   localStorage.setItem("user_id", user_id);
 }
 
+// The heatmap from the last challenge, so the server only sends what changed
+function loadStoredHeatmap() {
+  try {
+    return JSON.parse(localStorage.getItem("heatmap"));
+  } catch (e) {
+    return null;
+  }
+}
+
+function storeHeatmap(data) {
+  try {
+    localStorage.setItem(
+      "heatmap",
+      JSON.stringify({
+        epoch: data.heatmap_epoch,
+        version: data.heatmap_version,
+        heatmap: data.heatmap,
+      }),
+    );
+  } catch (e) {
+    // Storage is full or disabled; the next challenge gets the full heatmap
+  }
+}
+
 // Configuration
 const totalQuestions = 10;
 const penalty = 10;
@@ -219,6 +243,7 @@ function submitAnswer() {
 
 function endChallenge() {
   questionContainer.style.display = "none";
+  const stored = loadStoredHeatmap();
   fetch("/submit", {
     method: "POST",
     headers: {
@@ -227,10 +252,22 @@ function endChallenge() {
     body: JSON.stringify({
       responses: sessionResults,
       user_id: user_id,
+      heatmap_epoch: stored ? stored.epoch : null,
+      heatmap_version: stored ? stored.version : null,
     }),
   })
     .then((response) => response.json())
     .then((data) => {
+      // Apply the changed cells to the heatmap we already had
+      if (data.heatmap_delta) {
+        data.heatmap = Object.assign(
+          {},
+          stored ? stored.heatmap : {},
+          data.heatmap_delta,
+        );
+      }
+      storeHeatmap(data);
+
       // Save the data so it can be used in the share button
       challengeData = data;
 
@@ -368,11 +405,15 @@ function renderHeatmapUnicode() {
 function shareStats() {
   const gridRows = renderHeatmapUnicode();
 
-  // Construct the share text.
+  // Construct the share text. Links name the player by their share id,
+  // never by user_id.
+  const shareLink = challengeData.share_id
+    ? `https://times-tables.me/?user=${encodeURIComponent(challengeData.share_id)}`
+    : "https://times-tables.me";
   const shareText =
     `${challengeData.user_avg.toFixed(2)} s avg on ${challengeData.user_count} problems\n\n` +
     gridRows.join("\n") +
-    `\nhttps://times-tables.me`;
+    `\n${shareLink}`;
 
   // Use the Clipboard API.
   navigator.clipboard
@@ -0,0 +1,206 @@
+"""
+Database files of the times-tables and pizza apps.
+
+Each app keeps its tables in its own SQLite file, so a burst of /submit
+writes never waits on a pizza join's write lock and vice versa. connect()
+opens a store with its own connection settings, and init_database()
+creates a store's schema, applies its migrations and splits up a combined
+data.db from before the stores were separated.
+"""
+
+import os
+import pathlib
+import sqlite3
+from typing import Dict, List, NamedTuple
+
+from migrations import (
+    PIZZA_MIGRATIONS,
+    TIMES_TABLES_MIGRATIONS,
+    Migration,
+    apply_migrations,
+)
+from structured_logging import get_logger
+
+TIMES_TABLES = "times_tables"
+PIZZA = "pizza"
+
+# Database that held both apps' tables before they were split
+LEGACY_DATABASE = os.environ.get("DATABASE", "data.db")
+# Every migration applied to the legacy database belongs to this store
+LEGACY_MIGRATIONS_STORE = PIZZA
+
+log = get_logger(__name__)
+
+
+class Store(NamedTuple):
+    """Database file of one app and how to set it up."""
+
+    path: str
+    schema: str
+    migrations: List[Migration]
+    tables: List[str]
+    pragmas: Dict[str, str]
+
+
+STORES: Dict[str, Store] = {
+    TIMES_TABLES: Store(
+        path=os.environ.get("TIMES_TABLES_DATABASE", "times_tables.db"),
+        schema="create_times_tables_database.sql",
+        migrations=TIMES_TABLES_MIGRATIONS,
+        tables=["responses", "agg_pair", "agg_user"],
+        # Answers arrive in bursts, and losing the last few on power loss is
+        # acceptable, so commits skip the fsync WAL mode makes optional
+        pragmas={"synchronous": "NORMAL", "busy_timeout": "5000"},
+    ),
+    PIZZA: Store(
+        path=os.environ.get("PIZZA_DATABASE", "pizza.db"),
+        schema="create_pizza_database.sql",
+        migrations=PIZZA_MIGRATIONS,
+        tables=[
+            "pizza_attendees",
+            "pizza_preferences",
+            "pizza_selections",
+            "pizza_parties",
+            "named_pizzas",
+            "named_pizzas_ingredients",
+            "named_pizzas_search",
+        ],
+        # Party sign-ups are entered by hand, so every commit is synced.
+        # Foreign keys are off by default in SQLite, and retention relies on
+        # ON DELETE CASCADE to remove an attendee's preferences and selections.
+        pragmas={"synchronous": "FULL", "busy_timeout": "5000", "foreign_keys": "ON"},
+    ),
+}
+
+
+def database_path(store: str) -> str:
+    """Get the file of a store."""
+    return STORES[store].path
+
+
+def database_exists(store: str) -> bool:
+    """Check whether a store's file has been created yet."""
+    return os.path.exists(STORES[store].path)
+
+
+def connect(store: str) -> sqlite3.Connection:
+    """
+    Open a connection to one of the STORES with its connection settings.
+
+    Args:
+        store (str): TIMES_TABLES or PIZZA
+
+    Returns:
+        sqlite3.Connection: Open connection to the store's database
+    """
+    config = STORES[store]
+    conn = sqlite3.connect(config.path)
+    for pragma, value in config.pragmas.items():
+        # Some pragmas echo their new value, which would leave a statement open
+        conn.execute(f"PRAGMA {pragma} = {value}").close()
+    return conn
+
+
+def missing_stores() -> List[str]:
+    """Get the stores whose files have not been created yet."""
+    return [name for name, store in STORES.items() if not os.path.exists(store.path)]
+
+
+def split_legacy_database() -> None:
+    """
+    Split a combined data.db into one database file per store.
+
+    Each store whose file does not exist yet gets a copy of the legacy
+    database made with the backup API, minus the other stores' tables. All
+    the copies are written to temporary files before any is renamed into
+    place, and only then is the legacy file renamed with a ".pre-split"
+    suffix and kept as a backup. A split cut short between renames is
+    finished on the next start, leaving the stores already in place alone.
+    """
+    if not os.path.exists(LEGACY_DATABASE) or not missing_stores():
+        return
+
+    # Opened without create, so a worker that gets here just after another
+    # one renamed the legacy file does not leave an empty data.db behind
+    uri = f"{pathlib.Path(LEGACY_DATABASE).resolve().as_uri()}?mode=rw"
+    try:
+        lock = sqlite3.connect(uri, timeout=60, uri=True)
+    except sqlite3.OperationalError:
+        # Already split and renamed
+        return
+    try:
+        # The backup API will not copy from a connection holding the write lock
+        legacy = sqlite3.connect(uri, uri=True)
+    except sqlite3.OperationalError:
+        lock.close()
+        return
+    try:
+        # Workers starting at the same time wait here, then find the split done
+        lock.execute("BEGIN IMMEDIATE")
+        missing = missing_stores()
+        if not missing:
+            return
+
+        for name in missing:
+            store = STORES[name]
+            temporary = f"{store.path}.split"
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+            target = sqlite3.connect(temporary)
+            legacy.backup(target)
+            for other in STORES.values():
+                if other is not store:
+                    for table in other.tables:
+                        target.execute(f"DROP TABLE IF EXISTS {table}")
+            if name != LEGACY_MIGRATIONS_STORE:
+                target.execute("PRAGMA user_version = 0")
+            target.commit()
+            target.execute("VACUUM")
+            target.close()
+
+        for name in missing:
+            os.replace(f"{STORES[name].path}.split", STORES[name].path)
+    finally:
+        legacy.close()
+        lock.close()
+
+    os.replace(LEGACY_DATABASE, f"{LEGACY_DATABASE}.pre-split")
+    log.info(
+        "Split the legacy database",
+        legacy=LEGACY_DATABASE,
+        databases={name: STORES[name].path for name in missing},
+    )
+
+
+def init_database(name: str) -> None:
+    """
+    Create a store's tables and triggers and apply its migrations.
+
+    A combined data.db is split up first, before any store file exists.
+
+    Args:
+        name (str): TIMES_TABLES or PIZZA
+    """
+    split_legacy_database()
+
+    store = STORES[name]
+    conn = connect(name)
+    cur = conn.cursor()
+
+    # Only takes effect on a new, empty file; retention.py --convert
+    # switches existing databases over
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Readers never wait for the writer, and the setting sticks to the file
+    conn.execute("PRAGMA journal_mode = WAL").close()
+
+    # Read and execute the SQL schema file
+    with open(store.schema, "r") as sql_file:
+        sql_script = sql_file.read()
+        cur.executescript(sql_script)
+
+    conn.commit()
+
+    apply_migrations(conn, store.migrations)
+    conn.close()
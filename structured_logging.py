@@ -0,0 +1,193 @@
+"""
+Structured logging that keeps log I/O off the request thread.
+
+Records go through a bounded queue to a background listener that writes
+them to stderr as one JSON object per line. Keyword arguments passed to a
+logger from get_logger() become fields of the record; callables among them
+are only evaluated once the record is known to be written, so debug detail
+costs nothing while its level is disabled.
+
+Configured from the environment:
+    LOG_LEVEL        Root level (default INFO)
+    LOG_LEVELS       Per-module levels, e.g. "app=DEBUG,migrations=WARNING"
+    LOG_SAMPLE_RATE  Share of requests whose DEBUG records are kept (default 1)
+    LOG_QUEUE_SIZE   Records buffered before new ones are dropped (default 10000)
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import zlib
+from typing import Any, Dict, MutableMapping, Optional, Tuple
+
+# Id of the request being handled, attached to every record logged during it
+REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+
+# Arguments of Logger.log() that are not record fields
+LOGGER_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+LISTENER: Optional[logging.handlers.QueueListener] = None
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger adapter that turns keyword arguments into record fields."""
+
+    def process(
+        self, msg: Any, kwargs: MutableMapping[str, Any]
+    ) -> Tuple[Any, MutableMapping[str, Any]]:
+        fields = {
+            key: kwargs.pop(key) for key in list(kwargs) if key not in LOGGER_KWARGS
+        }
+        kwargs["extra"] = {**kwargs.get("extra", {}), "fields": fields}
+        return msg, kwargs
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a share of the records at or below a level.
+
+    Records logged during a request are kept or dropped together, based on a
+    hash of the request id, so a sampled request has all its debug records.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG) -> None:
+        super().__init__()
+        self.threshold = int(min(max(rate, 0.0), 1.0) * 10000)
+        self.max_level = max_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.threshold >= 10000:
+            return True
+
+        request_id = REQUEST_ID.get()
+        if request_id is None:
+            return random.randrange(10000) < self.threshold
+        return zlib.crc32(request_id.encode()) % 10000 < self.threshold
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks and resolves lazy fields before queueing.
+
+    When the queue is full the record is dropped, and the number of dropped
+    records is reported on the next record that fits.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        fields = {
+            key: value() if callable(value) else value
+            for key, value in getattr(record, "fields", {}).items()
+        }
+        if self.dropped:
+            fields["dropped_records"] = self.dropped
+
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        prepared.fields = fields
+        prepared.request_id = REQUEST_ID.get()
+        if record.exc_info:
+            prepared.exc_text = logging.Formatter().formatException(record.exc_info)
+            prepared.exc_info = None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a prepared record as one JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """
+    Parse per-module levels.
+
+    Args:
+        spec (str): Comma-separated module=LEVEL pairs
+
+    Returns:
+        Dict[str, str]: Level name for each module
+    """
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            module, level = part.split("=", 1)
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Route logging through the background queue listener.
+
+    Safe to call more than once; only the first call configures anything.
+    """
+    global LISTENER
+    if LISTENER is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(
+        SamplingFilter(float(os.environ.get("LOG_SAMPLE_RATE", "1")))
+    )
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    root.addHandler(queue_handler)
+    for module, level in parse_levels(os.environ.get("LOG_LEVELS", "")).items():
+        logging.getLogger(module).setLevel(level)
+
+    LISTENER = logging.handlers.QueueListener(log_queue, stream_handler)
+    LISTENER.start()
+    atexit.register(LISTENER.stop)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """
+    Get a logger whose keyword arguments become structured fields.
+
+    Args:
+        name (str): Logger name, usually the module's __name__
+
+    Returns:
+        StructuredLogger: Logger adapter for the module
+    """
+    return StructuredLogger(logging.getLogger(name), {})
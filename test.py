@@ -4,7 +4,7 @@ import os
 import code
 
 app = Flask(__name__)
-DATABASE = "data.db"
+DATABASE = "times_tables.db"
 
 conn = sqlite3.connect(DATABASE)
 cur = conn.cursor()
@@ -0,0 +1,292 @@
+"""
+The times-tables.me multiplication challenge.
+
+Players submit their answers to /submit and get back the world heatmap of
+average answer times, which /heatmap.png also serves as an image for link
+previews. The times-tables database is set up and the shared
+pair aggregates are attached to when the blueprint serves its first
+request, so workers that never see a challenge skip both.
+"""
+
+import os
+import re
+import secrets
+import threading
+from typing import Any, Dict, Optional
+
+from flask import Blueprint, current_app, jsonify, request
+
+from aggregate_matrix import AggregateMatrix
+from heatmap_image import HeatmapImageCache, RenderedImage, render_heatmap
+from startup_profile import profiled
+from storage import TIMES_TABLES, connect, database_path, init_database
+
+blueprint = Blueprint("times_tables", __name__)
+
+# Seconds between checks of the shared pair aggregates against agg_pair
+AGGREGATE_CHECK_INTERVAL = float(os.environ.get("AGGREGATE_CHECK_INTERVAL", "60"))
+
+# Seconds a worker serves a rendered heatmap image before checking for new answers
+HEATMAP_IMAGE_MAX_AGE = float(os.environ.get("HEATMAP_IMAGE_MAX_AGE", "60"))
+# Maximum number of rendered heatmap images kept per worker
+HEATMAP_IMAGE_CACHE_SIZE = int(os.environ.get("HEATMAP_IMAGE_CACHE_SIZE", "1024"))
+# Share ids /heatmap.png accepts, as made by secrets.token_urlsafe()
+SHARE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+# Pair aggregates shared by all workers, behind the /submit heatmap
+AGGREGATES = AggregateMatrix(database_path(TIMES_TABLES), AGGREGATE_CHECK_INTERVAL)
+
+# Rendered heatmap images, keyed by share id, or None for the world heatmap
+HEATMAP_IMAGES = HeatmapImageCache(HEATMAP_IMAGE_CACHE_SIZE, HEATMAP_IMAGE_MAX_AGE)
+
+INITIALIZED = False
+INITIALIZE_LOCK = threading.Lock()
+
+
+def initialize() -> None:
+    """
+    Set up the times-tables database, once per worker.
+
+    Also attaches to the shared pair aggregates, rebuilding them from
+    agg_pair if this is the first worker or they have drifted.
+    """
+    global INITIALIZED
+    if INITIALIZED:
+        return
+
+    with INITIALIZE_LOCK:
+        if INITIALIZED:
+            return
+        with profiled("init times_tables"):
+            init_database(TIMES_TABLES)
+
+            conn = connect(TIMES_TABLES)
+            AGGREGATES.open(conn.cursor())
+            conn.close()
+        INITIALIZED = True
+
+
+@blueprint.before_request
+def initialize_on_first_request() -> None:
+    """Initialize the times-tables app before its first request."""
+    initialize()
+
+
+@blueprint.route("/submit", methods=["POST"])
+def submit() -> Dict[str, Any]:
+    """
+    Submit times table responses and return aggregated statistics.
+
+    Clients that keep the heatmap between visits send the heatmap_epoch and
+    heatmap_version they last saw, and get back heatmap_delta, holding only
+    the cells changed since, instead of heatmap whenever that version is
+    recent enough. Either way the response then carries the new epoch and
+    version.
+
+    Returns:
+        Dict[str, Any]: JSON response with heatmap data and statistics
+    """
+    data = request.get_json()
+    responses = data.get("responses", [])
+    user_id = data.get("user_id")
+
+    if not user_id:
+        return jsonify({"error": "No user_id provided"}), 400
+
+    conn = connect(TIMES_TABLES)
+    cur = conn.cursor()
+
+    # Insert each raw response and update aggregation tables. The shared
+    # aggregates are updated under the same lock, so they never drift from
+    # agg_pair.
+    with AGGREGATES.updating(cur):
+        stored = []
+        for resp in responses:
+            # Insert into the raw responses table. The shared aggregates are
+            # given the values as stored, after SQLite's type conversions,
+            # so they add up exactly as agg_pair's trigger does.
+            cur.execute(
+                """
+              INSERT INTO responses
+                (user_id, a, b, user_answer, correct, time_taken, effective_time)
+              VALUES (?, ?, ?, ?, ?, ?, ?)
+              RETURNING a, b, effective_time, correct
+            """,
+                (
+                    user_id,
+                    resp["a"],
+                    resp["b"],
+                    resp["user_answer"],
+                    int(resp["correct"]),
+                    resp["time_taken"],
+                    resp["effective_time"],
+                ),
+            )
+            stored.append(cur.fetchone())
+
+        # Give the player a share id for links to their heatmap, once they
+        # have answered something
+        cur.execute(
+            "UPDATE agg_user SET share_id = ? WHERE user_id = ? AND share_id IS NULL",
+            (secrets.token_urlsafe(12), user_id),
+        )
+
+        conn.commit()
+
+        AGGREGATES.add(
+            [
+                (
+                    a,
+                    b,
+                    # SQLite adds text that is not a number as 0
+                    effective_time if isinstance(effective_time, (int, float)) else 0.0,
+                    correct != 0,
+                )
+                for a, b, effective_time, correct in stored
+            ]
+        )
+
+    # The heatmap and world stats come from the shared aggregates, not SQL.
+    heatmap = AGGREGATES.heatmap_since(
+        data.get("heatmap_epoch"), data.get("heatmap_version")
+    )
+
+    # Retrieve per-user stats from agg_user.
+    cur.execute(
+        """
+      SELECT total_effective_time, count, share_id
+      FROM agg_user
+      WHERE user_id = ?
+    """,
+        (user_id,),
+    )
+    user_row = cur.fetchone()
+    if user_row and user_row[1]:
+        user_avg = user_row[0] / user_row[1]
+        user_count = user_row[1]
+    else:
+        user_avg, user_count = 0, 0
+    share_id = user_row[2] if user_row else None
+
+    conn.close()
+
+    result = {
+        "heatmap": heatmap.cells,
+        "user_avg": user_avg,
+        "user_count": user_count,
+        "world_avg": heatmap.world_avg,
+        "world_count": heatmap.world_count,
+    }
+    if share_id is not None:
+        result["share_id"] = share_id
+    # Older clients neither send nor expect a version
+    if "heatmap_version" in data:
+        result["heatmap_epoch"] = heatmap.epoch
+        result["heatmap_version"] = heatmap.version
+        if heatmap.delta:
+            result["heatmap_delta"] = result.pop("heatmap")
+
+    return jsonify(result)
+
+
+@blueprint.route("/heatmap.png")
+def heatmap_image():
+    """
+    Serve the world heatmap, or one player's with ?user=<share_id>, as a PNG.
+
+    Players are named by the share id /submit returns, never by user_id.
+    Images are cached per worker and only redrawn when the answers behind
+    them have changed, and that is checked at most every
+    HEATMAP_IMAGE_MAX_AGE seconds, as is a share id nobody has, so previews
+    of a widely shared link are served from memory.
+
+    Returns:
+        Response: PNG image, or JSON error for an unknown share id
+    """
+    share_id = request.args.get("user") or None
+    if share_id is not None and not SHARE_ID_PATTERN.fullmatch(share_id):
+        return jsonify({"error": "Invalid user"}), 400
+
+    entry = HEATMAP_IMAGES.fresh(share_id)
+    if entry is None and not HEATMAP_IMAGES.missing(share_id):
+        with HEATMAP_IMAGES.render_lock(share_id):
+            # Another request may have redrawn it while this one waited
+            entry = HEATMAP_IMAGES.fresh(share_id)
+            if entry is None and not HEATMAP_IMAGES.missing(share_id):
+                if share_id is None:
+                    entry = refresh_world_heatmap_image()
+                else:
+                    entry = refresh_user_heatmap_image(share_id)
+
+    if entry is None:
+        return jsonify({"error": "No answers from that user"}), 404
+
+    response = current_app.response_class(entry.png, mimetype="image/png")
+    response.set_etag(entry.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = int(HEATMAP_IMAGE_MAX_AGE)
+    return response.make_conditional(request)
+
+
+def refresh_world_heatmap_image() -> RenderedImage:
+    """Redraw the cached world heatmap image if the shared aggregates have changed."""
+    heatmap = AGGREGATES.heatmap_since()
+    version = (heatmap.epoch, heatmap.version)
+
+    entry = HEATMAP_IMAGES.get(None)
+    if entry is not None and entry.version == version:
+        return HEATMAP_IMAGES.touch(None, entry)
+    return HEATMAP_IMAGES.put(None, version, render_heatmap(heatmap.cells))
+
+
+def refresh_user_heatmap_image(share_id: str) -> Optional[RenderedImage]:
+    """
+    Redraw a player's cached heatmap image if they have answered more since.
+
+    The image is drawn from agg_user_pair, which like agg_user, whose count
+    serves as the version, keeps answers that retention has deleted.
+
+    Args:
+        share_id (str): The share id of the player whose heatmap to draw
+
+    Returns:
+        Optional[RenderedImage]: The image, or None if nobody has that share
+            id or they have no answers
+    """
+    conn = connect(TIMES_TABLES)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT user_id, count FROM agg_user WHERE share_id = ?", (share_id,)
+        )
+        row = cur.fetchone()
+        if row is None or not row[1]:
+            HEATMAP_IMAGES.put_missing(share_id)
+            return None
+        user_id, version = row
+
+        entry = HEATMAP_IMAGES.get(share_id)
+        if entry is not None and entry.version == version:
+            return HEATMAP_IMAGES.touch(share_id, entry)
+
+        cur.execute(
+            """
+            SELECT a, b, total_effective_time, count, wrong_count
+            FROM agg_user_pair
+            WHERE user_id = ?
+        """,
+            (user_id,),
+        )
+        cells = {
+            f"{a}_{b}": {
+                "avg_effective": round(total / count, 1),
+                "count": count,
+                "wrong_count": wrong_count,
+            }
+            for a, b, total, count, wrong_count in cur.fetchall()
+            if count
+        }
+    finally:
+        conn.close()
+
+    return HEATMAP_IMAGES.put(share_id, version, render_heatmap(cells))